@@ -3,7 +3,7 @@ FinWise Financial Assistant - Multi-Agent System
 """
 
 # Import all agent classes
-from .master_agent import MasterFinancialStrategistAgent
+from .master_agent import MasterFinancialStrategistAgent, get_master_agent
 from .income_expense_analyzer import IncomeExpenseAnalyzerAgent
 from .budget_planner import BudgetPlannerAgent
 from .investment_advisor import InvestmentAdvisorAgent
@@ -2,7 +2,8 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import SystemMessage, HumanMessage
 from typing import Dict, Any, List, Tuple
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
+from dateutil.relativedelta import relativedelta
 
 from config import settings
 from tools import FinancialCalculators
@@ -277,7 +278,7 @@ class DebtOptimizerAgent:
     
     def _calculate_completion_date(self, months: int) -> str:
         """Calculate estimated completion date"""
-        return (datetime.now() + timedelta(days=months * 30)).strftime("%B %Y")
+        return (datetime.now() + relativedelta(months=months)).strftime("%B %Y")
     
     def _calculate_consolidation_savings(self, debts: List[Dict], new_rate: float) -> float:
         """Calculate potential interest savings from consolidation"""
@@ -3,6 +3,7 @@ from langchain_core.messages import SystemMessage, HumanMessage
 from typing import Dict, Any, List
 import logging
 from datetime import datetime
+import numpy as np
 import pandas as pd
 
 from config import settings
@@ -96,12 +97,18 @@ class IncomeExpenseAnalyzerAgent:
 
     def _analyze_categories(self, categorized: Dict[str, List[Dict]]) -> Dict[str, float]:
         """Analyze spending by category with percentages"""
-        total_expenses = sum(abs(t.get('amount', 0)) for t in categorized.get('expenses', []))
-        category_totals = {}
-        for transaction in categorized.get('expenses', []):
-            cat = str(transaction.get('category', 'Uncategorized'))
-            category_totals[cat] = category_totals.get(cat, 0) + abs(transaction.get('amount', 0))
-        return {k: round((v / total_expenses) * 100, 1) for k, v in category_totals.items()} if total_expenses > 0 else {}
+        expenses = categorized.get('expenses', [])
+        if not expenses:
+            return {}
+        
+        # Columnar: encode categories to integer codes once, then sum per code in numpy
+        amounts = np.abs(np.fromiter((t.get('amount', 0) for t in expenses), dtype=np.float64, count=len(expenses)))
+        total_expenses = amounts.sum()
+        if total_expenses <= 0:
+            return {}
+        codes, names = pd.factorize(np.array([str(t.get('category', 'Uncategorized')) for t in expenses], dtype=object))
+        category_totals = np.bincount(codes, weights=amounts, minlength=len(names))
+        return {str(name): round(float(total / total_expenses) * 100, 1) for name, total in zip(names, category_totals)}
 
     def _identify_recurring_transactions(self, transactions: List[Dict[str, Any]]) -> Dict[str, List[Dict]]:
         """Identify recurring income and expense patterns"""
@@ -293,23 +300,43 @@ class IncomeExpenseAnalyzerAgent:
         score -= len(patterns.get("concerns", [])) * 3
         return max(0, min(100, score))
 
-    def _serialize_dict(self, obj: Any) -> Any:
-        """Recursively convert all pandas/complex structures to JSON-safe types"""
-        if obj is None:
-            return None
-        if isinstance(obj, (str, int, float, bool)):
-            return obj
-        if isinstance(obj, pd.Series):
-            return {str(k): float(v) for k, v in obj.to_dict().items()}
-        if isinstance(obj, pd.DataFrame):
-            return [self._serialize_dict(r.to_dict()) for _, r in obj.iterrows()]
-        if isinstance(obj, dict):
-            return {str(k): self._serialize_dict(v) for k, v in obj.items()}
-        if isinstance(obj, list):
-            return [self._serialize_dict(v) for v in obj]
-        if hasattr(obj, "__dict__"):
-            return self._serialize_dict(obj.__dict__)
-        return str(obj)
+    def _serialize_dict(self, obj: Any, max_depth: int = 64) -> Any:
+        """Convert all pandas/complex structures to JSON-safe types.
+
+        Walks the tree with an explicit stack instead of recursion so deeply nested LLM
+        output cannot hit the recursion limit; containers nested below max_depth are
+        replaced with a truncation marker.
+        """
+        root = [None]
+        stack = [(root, 0, obj, 0)]
+        while stack:
+            parent, slot, value, depth = stack.pop()
+            if value is None or isinstance(value, (str, int, float, bool)):
+                parent[slot] = value
+                continue
+            if isinstance(value, pd.Series):
+                parent[slot] = {str(k): float(v) for k, v in value.to_dict().items()}
+                continue
+            if depth >= max_depth:
+                parent[slot] = f"<{type(value).__name__} truncated>"
+                continue
+            if isinstance(value, pd.DataFrame):
+                value = value.to_dict(orient="records")
+            elif not isinstance(value, (dict, list)) and hasattr(value, "__dict__"):
+                value = value.__dict__
+
+            if isinstance(value, dict):
+                container = parent[slot] = {}
+                for k, v in value.items():
+                    key = str(k)
+                    container[key] = None  # Reserve the slot to keep key order
+                    stack.append((container, key, v, depth + 1))
+            elif isinstance(value, list):
+                container = parent[slot] = [None] * len(value)
+                stack.extend((container, i, v, depth + 1) for i, v in enumerate(value))
+            else:
+                parent[slot] = str(value)
+        return root[0]
 
     def _get_empty_analysis_response(self) -> Dict[str, Any]:
         return {
@@ -1,7 +1,10 @@
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import SystemMessage, HumanMessage
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple, AsyncIterator, Callable
+from string import Template
 import logging
+import re
+import threading
 
 from config import settings
 from graph.state import AnalysisType
@@ -9,17 +12,101 @@ from utils import ColorFormatter
 
 logger = logging.getLogger(__name__)
 
-class MasterFinancialStrategistAgent:
-    """Orchestrates the multi-agent financial system and coordinates all sub-agents"""
-    
-    def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(
-            model=settings.MODEL_NAME,
-            temperature=settings.get_agent_config("master")["temperature"],
-            google_api_key=settings.GEMINI_API_KEY
-        )
+# Keyword rules for _fallback_analysis_type, in priority order
+_FALLBACK_RULES = (
+    (re.compile(r'budget|save|spending plan', re.IGNORECASE), AnalysisType.BUDGET_PLANNING),
+    (re.compile(r'invest|stock|retirement', re.IGNORECASE), AnalysisType.INVESTMENT_ADVICE),
+    (re.compile(r'debt|loan|credit card', re.IGNORECASE), AnalysisType.DEBT_OPTIMIZATION),
+    (re.compile(r'explain|what is|how to', re.IGNORECASE), AnalysisType.FINANCIAL_EDUCATION),
+    (re.compile(r'spending|expense|income', re.IGNORECASE), AnalysisType.INCOME_EXPENSE),
+)
+
+# Section headings of a streamed plan, matched only at the start of a line (optionally
+# wrapped in markdown) so the phrases can appear in prose without ending the summary
+_SUMMARY_START_RE = re.compile(r'^[ \t#*]*(?:1\.[ \t*]*)?EXECUTIVE SUMMARY[ \t*:]*', re.MULTILINE)
+_SUMMARY_END_RE = re.compile(r'^[ \t#*]*2\.[ \t*]*PRIORITY ACTIONS', re.MULTILINE)
+
+# Prompt templates are compiled once at import and filled from the flat dict
+# returned by ``_prepare_synthesis_data``.
+_SYNTH_TEMPLATE = Template("""
+        SYNTHESIZE A COMPREHENSIVE FINANCIAL PLAN
+        
+        USER PROFILE:
+        ${user_profile}
+        
+        AVAILABLE ANALYSES:
+        ${analyses_summary}
+        
+        KEY METRICS AND INSIGHTS:
+        ${key_metrics}
+        
+        Create a cohesive, personalized financial plan that:
+        
+        1. EXECUTIVE SUMMARY: Brief overview of current financial health and key recommendations
+        2. PRIORITY ACTIONS (What to do now):
+           - Immediate steps (next 30 days)
+           - Quick wins that provide immediate benefit
+           - Critical fixes for any financial risks
+        3. STRATEGIC RECOMMENDATIONS (What to do next):
+           - Budget optimization strategies
+           - Debt management approach
+           - Investment strategy alignment
+           - Savings acceleration tactics
+        4. IMPLEMENTATION ROADMAP:
+           - Month 1-3: Foundation building
+           - Month 4-6: Debt reduction and savings growth
+           - Month 7-12: Investment optimization
+           - Year 2+: Long-term wealth building
+        5. RISK MANAGEMENT:
+           - Emergency fund status and recommendations
+           - Insurance considerations
+           - Market risk exposure
+           - Liquidity needs
+        6. PROGRESS TRACKING:
+           - Key metrics to monitor monthly
+           - Milestone celebrations
+           - Warning signs to watch for
+        7. PERSONALIZED MOTIVATION:
+           - Connect recommendations to user's specific goals
+           - Highlight the emotional benefits of financial security
+           - Provide encouragement for the journey ahead
+        
+        Make this plan SPECIFIC, ACTIONABLE, and PERSONALIZED. Use concrete numbers and timelines.
+        Focus on practical steps the user can implement immediately.
+        Use Indian Rupees (₹) for all currency values.
+        """)
+
+_ONESHOT_TEMPLATE = Template("""
+        USER REQUEST: "${user_input}"
+        
+        USER PROFILE:
+        ${user_profile}
+        
+        AVAILABLE ANALYSES:
+        ${analyses_summary}
         
-        self.system_prompt = SystemMessage(content="""
+        KEY METRICS AND INSIGHTS:
+        ${key_metrics}
+        
+        On the FIRST line, write "RELEVANT DOMAINS:" followed by a comma-separated list of the
+        domains that matter most for this request, chosen from: ${domains}.
+        
+        Then write a cohesive, personalized financial plan with these sections:
+        1. EXECUTIVE SUMMARY
+        2. PRIORITY ACTIONS
+        3. STRATEGIC RECOMMENDATIONS
+        4. IMPLEMENTATION ROADMAP
+        5. RISK MANAGEMENT
+        6. PROGRESS TRACKING
+        7. PERSONALIZED MOTIVATION
+        
+        Focus on the relevant domains. Make the plan SPECIFIC, ACTIONABLE, and PERSONALIZED.
+        Use concrete numbers and timelines. Use Indian Rupees (₹) for all currency values.
+        """)
+
+# Built once per process so every agent instance (and worker) sends byte-identical
+# system prompts, which keeps provider-side prompt caching effective.
+_SYSTEM_PROMPT = SystemMessage(content="""
         You are the Master Financial Strategist, an AI that coordinates multiple specialized financial agents.
 
         Your responsibilities:
@@ -39,6 +126,193 @@ class MasterFinancialStrategistAgent:
         Always consider the user's complete financial picture when making recommendations.
         Ensure all recommendations are practical, personalized, and actionable.
         """)
+
+_CLASSIFICATION_SCHEMA = {
+    "title": "AnalysisClassification",
+    "description": "The single analysis type best suited to the user's request",
+    "type": "object",
+    "properties": {
+        "type": {"type": "string", "enum": [t.value for t in AnalysisType]}
+    },
+    "required": ["type"]
+}
+
+_PLAN_HEADER = "🎯 YOUR COMPREHENSIVE FINANCIAL PLAN\n" + "=" * 60 + "\n\n"
+
+_NO_KEY_METRICS = "Key metrics being calculated..."
+
+# Field holding each specialist's own LLM-written recommendations
+_NARRATIVE_KEYS = {
+    "income_analysis": "insights",
+    "budget_plan": "detailed_recommendations",
+    "investment_advice": "recommendations",
+    "debt_optimization": "detailed_recommendations"
+}
+
+_FALLBACK_INTRO = "I've analyzed your financial situation and here are my key recommendations:"
+
+_FALLBACK_NEXT_STEPS = "\n".join((
+    "\n🚀 NEXT STEPS:",
+    "1. Review your monthly spending patterns",
+    "2. Set up automatic savings transfers",
+    "3. Create a debt repayment schedule",
+    "4. Start investing with your risk profile",
+))
+
+# === Per-analysis dispatch tables ===
+# Each helper is a pure function of one analysis dict; the tables below map the
+# analysis key to its helper so callers do a single dict lookup per analysis.
+
+def _insight_income(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    summary_metrics = data.get('summary_metrics', {})
+    if not isinstance(summary_metrics, dict):
+        return None
+    
+    net_flow = summary_metrics.get('net_cash_flow', 0)
+    if not isinstance(net_flow, (int, float)):
+        net_flow = 0
+    
+    return {
+        "agent": "income_expense_analyzer",
+        "title": "Cash Flow Analysis",
+        "description": f"Monthly net cash flow: ₹{net_flow:,.2f}",
+        "actionType": "optimize_spending" if net_flow < 0 else "increase_savings"
+    }
+
+def _insight_budget(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    savings_rate = data.get('savings_rate', 0)
+    if not isinstance(savings_rate, (int, float)):
+        savings_rate = 0
+    
+    return {
+        "agent": "budget_planner",
+        "title": "Budget Optimization",
+        "description": f"Current savings rate: {savings_rate:.1f}%",
+        "actionType": "review_budget"
+    }
+
+def _insight_investment(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    risk_profile = data.get('risk_profile', 'moderate')
+    if not isinstance(risk_profile, str):
+        risk_profile = 'moderate'
+    
+    return {
+        "agent": "investment_advisor",
+        "title": "Investment Strategy",
+        "description": f"Recommended {risk_profile} portfolio",
+        "actionType": "invest"
+    }
+
+def _insight_debt(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    recommended_strategy = data.get('recommended_strategy', {})
+    if not isinstance(recommended_strategy, dict):
+        return None
+    
+    strategy = recommended_strategy.get('recommended_method', 'snowball')
+    if not isinstance(strategy, str):
+        strategy = 'snowball'
+    
+    return {
+        "agent": "debt_optimizer",
+        "title": "Debt Management",
+        "description": f"Use {strategy} method for optimal repayment",
+        "actionType": "manage_debt"
+    }
+
+_INSIGHT_EXTRACTORS: Dict[str, Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]] = {
+    "income_analysis": _insight_income,
+    "budget_plan": _insight_budget,
+    "investment_advice": _insight_investment,
+    "debt_optimization": _insight_debt
+}
+
+def _key_insight_income(data: Dict[str, Any]) -> str:
+    net_cash_flow = data.get('summary_metrics', {}).get('net_cash_flow', 0)
+    return f"Net cash flow: ₹{net_cash_flow:,.2f} monthly"
+
+def _key_insight_budget(data: Dict[str, Any]) -> str:
+    savings_target = data.get('savings_target', 0)
+    return f"Recommended savings: ₹{savings_target:,.2f} monthly"
+
+def _key_insight_investment(data: Dict[str, Any]) -> str:
+    risk_profile = data.get('risk_profile', 'moderate')
+    return f"Risk-appropriate {risk_profile} portfolio"
+
+def _key_insight_debt(data: Dict[str, Any]) -> str:
+    strategy = data.get('recommended_strategy', {}).get('recommended_method', 'snowball')
+    return f"Optimal strategy: {strategy} method"
+
+_KEY_INSIGHT_FORMATTERS: Dict[str, Callable[[Dict[str, Any]], str]] = {
+    "income_analysis": _key_insight_income,
+    "budget_plan": _key_insight_budget,
+    "investment_advice": _key_insight_investment,
+    "debt_optimization": _key_insight_debt,
+    "financial_education": lambda data: "Concept explanation provided"
+}
+
+def _fallback_income(data: Dict[str, Any]) -> str:
+    net_flow = data.get('summary_metrics', {}).get('net_cash_flow', 0)
+    if net_flow > 0:
+        return f"\n💸 INCOME & EXPENSES:\n• You're saving ₹{net_flow:,.2f} monthly - great job!"
+    return f"\n💸 INCOME & EXPENSES:\n• You're overspending by ₹{abs(net_flow):,.2f} monthly - let's fix this"
+
+def _fallback_budget(data: Dict[str, Any]) -> str:
+    savings_target = data.get('savings_target', 0)
+    return f"\n📊 BUDGET PLANNING:\n• Target monthly savings: ₹{savings_target:,.2f}"
+
+def _fallback_investment(data: Dict[str, Any]) -> str:
+    risk_profile = data.get('risk_profile', 'moderate')
+    return f"\n📈 INVESTMENT STRATEGY:\n• Recommended {risk_profile} risk portfolio"
+
+def _fallback_debt(data: Dict[str, Any]) -> str:
+    strategy = data.get('recommended_strategy', {}).get('recommended_method', 'snowball')
+    return f"\n⚡ DEBT MANAGEMENT:\n• Use {strategy} method for fastest results"
+
+_FALLBACK_SECTIONS: Dict[str, Callable[[Dict[str, Any]], str]] = {
+    "income_analysis": _fallback_income,
+    "budget_plan": _fallback_budget,
+    "investment_advice": _fallback_investment,
+    "debt_optimization": _fallback_debt
+}
+
+# Checked in priority order: the first analysis present decides the action type
+_ACTION_TYPE_BY_KEY = (
+    ("debt_optimization", "manage_debt"),
+    ("investment_advice", "invest"),
+    ("budget_plan", "review_budget"),
+    ("income_analysis", "optimize_spending")
+)
+
+# (analysis key, section, metric, predicate, priority) - first matching rule wins
+_PRIORITY_RULES = (
+    ("debt_optimization", "current_debt_situation", "debt_to_income_ratio", lambda v: v > 40, "high"),
+    ("income_analysis", "summary_metrics", "savings_rate", lambda v: v < 0, "high"),
+    ("income_analysis", "summary_metrics", "savings_rate", lambda v: v < 10, "medium")
+)
+
+class MasterFinancialStrategistAgent:
+    """Orchestrates the multi-agent financial system and coordinates all sub-agents"""
+    
+    def __init__(self):
+        config = settings.get_agent_config("master")
+        
+        self.llm_synth = ChatGoogleGenerativeAI(
+            model=config["synth_model"],
+            temperature=config["temperature"],
+            google_api_key=settings.GEMINI_API_KEY
+        )
+        
+        self.llm_classify = ChatGoogleGenerativeAI(
+            model=config["classify_model"],
+            temperature=config["classify_temperature"],
+            max_output_tokens=config["classify_max_tokens"],
+            google_api_key=settings.GEMINI_API_KEY
+        )
+        
+        # Enum-constrained decoding: the model can only emit one of the AnalysisType values
+        self.classifier = self.llm_classify.with_structured_output(_CLASSIFICATION_SCHEMA)
+        
+        self.system_prompt = _SYSTEM_PROMPT
     
     def determine_analysis_type(self, user_input: str, user_profile: Dict[str, Any]) -> AnalysisType:
         """Intelligently determine which analysis type is needed based on user input"""
@@ -62,24 +336,28 @@ class MasterFinancialStrategistAgent:
         - financial_education: For explaining concepts, "why" questions, learning, terminology
         - comprehensive: For general financial planning or when multiple areas need analysis
         
-        Return ONLY the analysis type as a single word from the available options.
+        Classify the request as exactly one of the available analysis types.
         """
         
         try:
-            response = self.llm.invoke([
-                self.system_prompt,
-                HumanMessage(content=prompt)
-            ])
-            
-            analysis_type_str = response.content.strip().lower()
-            logger.info(f"LLM determined analysis type: {analysis_type_str}")
-            
-            return self._map_to_analysis_type(analysis_type_str, user_input)
+            return self._classify(prompt)
             
         except Exception as e:
             logger.error(f"Error determining analysis type: {str(e)}")
             return self._fallback_analysis_type(user_input)
     
+    def _classify(self, prompt: str) -> AnalysisType:
+        """Classify a rendered prompt. Repeated prompts are answered by the process-wide
+        LLM cache (see setup_llm_cache); failures raise and are never cached."""
+        response = self.classifier.invoke([
+            self.system_prompt,
+            HumanMessage(content=prompt)
+        ])
+        
+        logger.info(f"LLM determined analysis type: {response['type']}")
+        
+        return AnalysisType(response["type"])
+    
     def synthesize_plan(self, user_profile: Dict[str, Any], analyses: Dict[str, Any]) -> Dict[str, Any]:
         """Synthesize multiple agent analyses into a comprehensive, actionable financial plan"""
         logger.info("Master agent synthesizing comprehensive financial plan")
@@ -93,110 +371,176 @@ class MasterFinancialStrategistAgent:
                 "actionType": None
             }
         
+        # A single analysis has nothing to cross-reference, so skip the LLM round-trip
+        if len(valid_analyses) == 1:
+            return self._single_domain_plan(next(iter(valid_analyses.items())), user_profile)
+        
         synthesis_data = self._prepare_synthesis_data(user_profile, valid_analyses)
         
-        prompt = f"""
-        SYNTHESIZE A COMPREHENSIVE FINANCIAL PLAN
+        prompt = _SYNTH_TEMPLATE.substitute(synthesis_data)
         
-        USER PROFILE:
-        {synthesis_data['user_profile']}
+        try:
+            response = self.llm_synth.invoke([
+                self.system_prompt,
+                HumanMessage(content=prompt)
+            ])
+            
+            synthesized_plan = self._format_final_output(response.content, valid_analyses)
+            logger.info("Successfully synthesized comprehensive financial plan")
+            
+            return {"response": synthesized_plan, **self._plan_metadata(valid_analyses)}
+            
+        except Exception as e:
+            logger.error(f"Error synthesizing plan: {str(e)}")
+            return {
+                "response": self._create_fallback_plan(valid_analyses),
+                "agent": "master",
+                "actionType": "review",
+                "priority": "medium"
+            }
+
+    def _single_domain_plan(self, analysis: Tuple[str, Dict[str, Any]],
+                            user_profile: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the plan for a single specialist analysis without calling the LLM"""
+        analysis_type, analysis_data = analysis
+        analyses = {analysis_type: analysis_data}
+        logger.info(f"Single analysis ({analysis_type}) - building plan without synthesis")
         
-        AVAILABLE ANALYSES:
-        {synthesis_data['analyses_summary']}
+        key_metrics = self._extract_key_metrics(analyses, user_profile)
+        narrative = analysis_data.get(_NARRATIVE_KEYS.get(analysis_type, ""))
+        
+        parts = (
+            f"EXECUTIVE SUMMARY: {self._extract_key_insight(analysis_type, analysis_data)}",
+            key_metrics != _NO_KEY_METRICS and f"\nKEY METRICS:\n{key_metrics}",
+            self._fallback_section(analysis_type, analysis_data),
+            isinstance(narrative, str) and narrative and f"\n{narrative.strip()}",
+            _FALLBACK_NEXT_STEPS,
+        )
         
-        KEY METRICS AND INSIGHTS:
-        {synthesis_data['key_metrics']}
+        return {
+            "response": self._format_final_output("\n".join(x for x in parts if x), analyses),
+            **self._plan_metadata(analyses)
+        }
+
+    def _plan_metadata(self, analyses: Dict[str, Any]) -> Dict[str, Any]:
+        """Plan fields derived from the analyses alone (no LLM output involved)"""
+        return {
+            "agent": "master",
+            "actionType": self._determine_action_type(analyses),
+            "priority": self._determine_priority(analyses),
+            "insights": self._extract_key_insights(analyses)
+        }
+
+    async def oneshot_comprehensive(self, user_input: str, user_profile: Dict[str, Any],
+                                    analyses: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Identify relevant domains and synthesize the plan in a single streamed LLM call.
+
+        Yields a ``header`` event, ``chunk`` events as tokens arrive, a ``summary`` event as
+        soon as the executive summary section is complete, and a final ``done`` event
+        carrying the same fields as ``synthesize_plan``.
+        """
+        logger.info("Master agent streaming one-shot comprehensive plan")
         
-        Create a cohesive, personalized financial plan that:
+        valid_analyses = {k: v for k, v in analyses.items() if v is not None and not v.get('error')}
         
-        1. EXECUTIVE SUMMARY: Brief overview of current financial health and key recommendations
-        2. PRIORITY ACTIONS (What to do now):
-           - Immediate steps (next 30 days)
-           - Quick wins that provide immediate benefit
-           - Critical fixes for any financial risks
-        3. STRATEGIC RECOMMENDATIONS (What to do next):
-           - Budget optimization strategies
-           - Debt management approach
-           - Investment strategy alignment
-           - Savings acceleration tactics
-        4. IMPLEMENTATION ROADMAP:
-           - Month 1-3: Foundation building
-           - Month 4-6: Debt reduction and savings growth
-           - Month 7-12: Investment optimization
-           - Year 2+: Long-term wealth building
-        5. RISK MANAGEMENT:
-           - Emergency fund status and recommendations
-           - Insurance considerations
-           - Market risk exposure
-           - Liquidity needs
-        6. PROGRESS TRACKING:
-           - Key metrics to monitor monthly
-           - Milestone celebrations
-           - Warning signs to watch for
-        7. PERSONALIZED MOTIVATION:
-           - Connect recommendations to user's specific goals
-           - Highlight the emotional benefits of financial security
-           - Provide encouragement for the journey ahead
+        if not valid_analyses:
+            yield {
+                "event": "done",
+                "response": "I apologize, but I couldn't gather enough data to create a comprehensive financial plan.",
+                "agent": "master",
+                "actionType": None,
+                "domains": []
+            }
+            return
         
-        Make this plan SPECIFIC, ACTIONABLE, and PERSONALIZED. Use concrete numbers and timelines.
-        Focus on practical steps the user can implement immediately.
-        Use Indian Rupees (₹) for all currency values.
-        """
+        synthesis_data = self._prepare_synthesis_data(user_profile, valid_analyses)
+        
+        prompt = _ONESHOT_TEMPLATE.substitute(
+            synthesis_data, user_input=user_input, domains=", ".join(valid_analyses)
+        )
+        
+        parts = []
+        # Stream text from the start of the current line onwards; only that line can still
+        # become the next heading, so each chunk is scanned once instead of the whole buffer
+        pending = ""
+        scanned = 0  # Offset of ``pending`` within the full text
+        summary_sent = False
+        
+        yield {"event": "header", "content": _PLAN_HEADER}
         
         try:
-            response = self.llm.invoke([
+            async for chunk in self.llm_synth.astream([
                 self.system_prompt,
                 HumanMessage(content=prompt)
-            ])
+            ]):
+                if not chunk.content:
+                    continue
+                parts.append(chunk.content)
+                yield {"event": "chunk", "content": chunk.content}
+                
+                # Early-commit the executive summary as soon as the next section starts
+                if not summary_sent:
+                    pending += chunk.content
+                    heading = _SUMMARY_END_RE.search(pending)
+                    if heading is None:
+                        line_start = pending.rfind("\n") + 1
+                        scanned += line_start
+                        pending = pending[line_start:]
+                        continue
+                    summary = self._extract_summary("".join(parts), scanned + heading.start())
+                    scanned += heading.end()
+                    pending = pending[heading.end():]
+                    if summary:
+                        summary_sent = True
+                        yield {"event": "summary", "content": summary}
             
-            synthesized_plan = self._format_final_output(response.content, valid_analyses)
-            logger.info("Successfully synthesized comprehensive financial plan")
+            domains, raw_plan = self._split_domains_header("".join(parts), valid_analyses)
+            logger.info("Successfully streamed one-shot comprehensive plan")
             
-            return {
-                "response": synthesized_plan,
-                "agent": "master",
-                "actionType": self._determine_action_type(valid_analyses),
-                "priority": self._determine_priority(valid_analyses),
-                "insights": self._extract_key_insights(valid_analyses)
+            yield {
+                "event": "done",
+                "response": self._format_final_output(raw_plan, valid_analyses),
+                **self._plan_metadata(valid_analyses),
+                "domains": domains
             }
             
         except Exception as e:
-            logger.error(f"Error synthesizing plan: {str(e)}")
-            return {
+            logger.error(f"Error streaming comprehensive plan: {str(e)}")
+            yield {
+                "event": "done",
                 "response": self._create_fallback_plan(valid_analyses),
                 "agent": "master",
                 "actionType": "review",
-                "priority": "medium"
+                "priority": "medium",
+                "domains": list(valid_analyses)
             }
 
+    def _split_domains_header(self, text: str, analyses: Dict[str, Any]) -> Tuple[List[str], str]:
+        """Split the leading RELEVANT DOMAINS line from the streamed plan body"""
+        head, _, body = text.lstrip().partition("\n")
+        if not head.upper().startswith("RELEVANT DOMAINS:"):
+            return list(analyses), text
+        
+        requested = [d.strip().lower() for d in head.split(":", 1)[1].split(",")]
+        domains = [d for d in requested if d in analyses]
+        return domains or list(analyses), body.lstrip()
+
+    def _extract_summary(self, text: str, end: int) -> str:
+        """Return the executive summary section of a streamed plan, given where the
+        PRIORITY ACTIONS heading line starts"""
+        start = _SUMMARY_START_RE.search(text, 0, end)
+        return text[start.end():end].strip() if start else ""
+
     def _determine_action_type(self, analyses: Dict[str, Any]) -> str:
         """Determine the primary action type based on available analyses"""
-        if "debt_optimization" in analyses:
-            return "manage_debt"
-        elif "investment_advice" in analyses:
-            return "invest"
-        elif "budget_plan" in analyses:
-            return "review_budget"
-        elif "income_analysis" in analyses:
-            return "optimize_spending"
-        else:
-            return "review"
+        return next((action for key, action in _ACTION_TYPE_BY_KEY if key in analyses), "review")
 
     def _determine_priority(self, analyses: Dict[str, Any]) -> str:
         """Determine priority level based on financial health indicators"""
-        if "debt_optimization" in analyses:
-            debt_data = analyses["debt_optimization"]
-            debt_ratio = debt_data.get("current_debt_situation", {}).get("debt_to_income_ratio", 0)
-            if debt_ratio > 40:
-                return "high"
-        
-        if "income_analysis" in analyses:
-            income_data = analyses["income_analysis"]
-            savings_rate = income_data.get("summary_metrics", {}).get("savings_rate", 0)
-            if savings_rate < 0:
-                return "high"
-            elif savings_rate < 10:
-                return "medium"
+        for key, section, metric, predicate, priority in _PRIORITY_RULES:
+            data = analyses.get(key)
+            if data and predicate(data.get(section, {}).get(metric, 0)):
+                return priority
         
         return "low"
 
@@ -205,182 +549,52 @@ class MasterFinancialStrategistAgent:
         insights = []
         
         for analysis_type, analysis_data in analyses.items():
-            if not analysis_data or analysis_data.get('error'):
+            extractor = _INSIGHT_EXTRACTORS.get(analysis_type)
+            if not extractor or not analysis_data or analysis_data.get('error'):
                 continue
-                
+            
             try:
-                insight = None
-                
-                if analysis_type == "income_analysis":
-                    summary_metrics = analysis_data.get('summary_metrics', {})
-                    if not isinstance(summary_metrics, dict):
-                        continue
-                        
-                    net_flow = summary_metrics.get('net_cash_flow', 0)
-                    if not isinstance(net_flow, (int, float)):
-                        net_flow = 0
-                    
-                    insight = {
-                        "agent": "income_expense_analyzer",
-                        "title": "Cash Flow Analysis",
-                        "description": f"Monthly net cash flow: ₹{net_flow:,.2f}",
-                        "actionType": "optimize_spending" if net_flow < 0 else "increase_savings"
-                    }
-                
-                elif analysis_type == "budget_plan":
-                    savings_rate = analysis_data.get('savings_rate', 0)
-                    if not isinstance(savings_rate, (int, float)):
-                        savings_rate = 0
-                    
-                    insight = {
-                        "agent": "budget_planner",
-                        "title": "Budget Optimization",
-                        "description": f"Current savings rate: {savings_rate:.1f}%",
-                        "actionType": "review_budget"
-                    }
-                
-                elif analysis_type == "investment_advice":
-                    risk_profile = analysis_data.get('risk_profile', 'moderate')
-                    if not isinstance(risk_profile, str):
-                        risk_profile = 'moderate'
-                    
-                    insight = {
-                        "agent": "investment_advisor",
-                        "title": "Investment Strategy",
-                        "description": f"Recommended {risk_profile} portfolio",
-                        "actionType": "invest"
-                    }
-                
-                elif analysis_type == "debt_optimization":
-                    recommended_strategy = analysis_data.get('recommended_strategy', {})
-                    if not isinstance(recommended_strategy, dict):
-                        continue
-                        
-                    strategy = recommended_strategy.get('recommended_method', 'snowball')
-                    if not isinstance(strategy, str):
-                        strategy = 'snowball'
-                    
-                    insight = {
-                        "agent": "debt_optimizer",
-                        "title": "Debt Management",
-                        "description": f"Use {strategy} method for optimal repayment",
-                        "actionType": "manage_debt"
-                    }
-                
+                insight = extractor(analysis_data)
                 if insight:
                     insights.append(insight)
-                    
             except Exception as e:
                 logger.warning(f"Error extracting insight from {analysis_type}: {str(e)}")
-                continue
         
         return insights
 
     def _extract_financial_context(self, user_profile: Dict[str, Any]) -> str:
         """Extract and format key financial context from user profile"""
-        context_parts = []
-        
         if not user_profile:
             return "No personal context provided."
 
-        # Basic demographics
-        if user_profile.get('age'):
-            context_parts.append(f"- Age: {user_profile['age']}")
-        
-        # Financial situation
-        if user_profile.get('annual_income'):
-            monthly_income = user_profile['annual_income'] / 12
-            context_parts.append(f"- Monthly Income: ₹{monthly_income:,.2f}")
-        
-        if user_profile.get('monthly_expenses'):
-            context_parts.append(f"- Monthly Expenses: ₹{user_profile['monthly_expenses']:,.2f}")
-        
-        if user_profile.get('savings'):
-            context_parts.append(f"- Current Savings: ₹{user_profile['savings']:,.2f}")
-        
-        # Debt situation
         debts = user_profile.get('debts', [])
-        if debts:
-            total_debt = sum(debt.get('balance', 0) for debt in debts)
-            context_parts.append(f"- Total Debt: ₹{total_debt:,.2f} across {len(debts)} accounts")
-        
-        # Goals
         goals = user_profile.get('financial_goals', [])
-        if goals:
-            goal_names = [goal.get('name', 'Unknown') for goal in goals]
-            context_parts.append(f"- Financial Goals: {', '.join(goal_names)}")
         
-        # Risk profile
-        if user_profile.get('risk_tolerance'):
-            context_parts.append(f"- Risk Tolerance: {user_profile['risk_tolerance']}")
+        context_parts = (
+            # Basic demographics
+            user_profile.get('age') and f"- Age: {user_profile['age']}",
+            # Financial situation
+            user_profile.get('annual_income') and f"- Monthly Income: ₹{user_profile['annual_income'] / 12:,.2f}",
+            user_profile.get('monthly_expenses') and f"- Monthly Expenses: ₹{user_profile['monthly_expenses']:,.2f}",
+            user_profile.get('savings') and f"- Current Savings: ₹{user_profile['savings']:,.2f}",
+            # Debt situation
+            debts and f"- Total Debt: ₹{sum(debt.get('balance', 0) for debt in debts):,.2f} across {len(debts)} accounts",
+            # Goals
+            goals and f"- Financial Goals: {', '.join(goal.get('name', 'Unknown') for goal in goals)}",
+            # Risk profile
+            user_profile.get('risk_tolerance') and f"- Risk Tolerance: {user_profile['risk_tolerance']}",
+        )
         
-        return "\n".join(context_parts) if context_parts else "Limited profile information available"
-    
-    def _map_to_analysis_type(self, analysis_type_str: str, user_input: str) -> AnalysisType:
-        """Map string response to AnalysisType enum with intelligent fallbacks"""
-        
-        # Direct mapping from common responses
-        type_mapping = {
-            "income": AnalysisType.INCOME_EXPENSE,
-            "expense": AnalysisType.INCOME_EXPENSE,
-            "spending": AnalysisType.INCOME_EXPENSE,
-            "cashflow": AnalysisType.INCOME_EXPENSE,
-            "budget": AnalysisType.BUDGET_PLANNING,
-            "savings": AnalysisType.BUDGET_PLANNING,
-            "allocation": AnalysisType.BUDGET_PLANNING,
-            "investment": AnalysisType.INVESTMENT_ADVICE,
-            "portfolio": AnalysisType.INVESTMENT_ADVICE,
-            "retirement": AnalysisType.INVESTMENT_ADVICE,
-            "stocks": AnalysisType.INVESTMENT_ADVICE,
-            "debt": AnalysisType.DEBT_OPTIMIZATION,
-            "loan": AnalysisType.DEBT_OPTIMIZATION,
-            "repayment": AnalysisType.DEBT_OPTIMIZATION,
-            "education": AnalysisType.FINANCIAL_EDUCATION,
-            "explain": AnalysisType.FINANCIAL_EDUCATION,
-            "what": AnalysisType.FINANCIAL_EDUCATION,
-            "how": AnalysisType.FINANCIAL_EDUCATION,
-            "comprehensive": AnalysisType.COMPREHENSIVE,
-            "general": AnalysisType.COMPREHENSIVE
-        }
-        
-        # Check for direct matches
-        for key, value in type_mapping.items():
-            if key in analysis_type_str:
-                return value
-        
-        # Keyword-based fallback
-        user_input_lower = user_input.lower()
-        if any(word in user_input_lower for word in ["spend", "expense", "income", "cash flow"]):
-            return AnalysisType.INCOME_EXPENSE
-        elif any(word in user_input_lower for word in ["budget", "save", "allocation"]):
-            return AnalysisType.BUDGET_PLANNING
-        elif any(word in user_input_lower for word in ["invest", "stock", "portfolio", "return"]):
-            return AnalysisType.INVESTMENT_ADVICE
-        elif any(word in user_input_lower for word in ["debt", "loan", "repay", "credit"]):
-            return AnalysisType.DEBT_OPTIMIZATION
-        elif any(word in user_input_lower for word in ["explain", "what is", "how does", "why"]):
-            return AnalysisType.FINANCIAL_EDUCATION
-        
-        # Default to comprehensive analysis
-        return AnalysisType.COMPREHENSIVE
+        return "\n".join(x for x in context_parts if x) or "Limited profile information available"
     
     def _fallback_analysis_type(self, user_input: str) -> AnalysisType:
         """Fallback analysis type determination when LLM fails"""
         logger.warning(f"Using fallback analysis type for: {user_input}")
         
-        user_input_lower = user_input.lower()
-        
-        # Simple keyword matching as fallback
-        if any(word in user_input_lower for word in ["budget", "save", "spending plan"]):
-            return AnalysisType.BUDGET_PLANNING
-        elif any(word in user_input_lower for word in ["invest", "stock", "retirement"]):
-            return AnalysisType.INVESTMENT_ADVICE
-        elif any(word in user_input_lower for word in ["debt", "loan", "credit card"]):
-            return AnalysisType.DEBT_OPTIMIZATION
-        elif any(word in user_input_lower for word in ["explain", "what is", "how to"]):
-            return AnalysisType.FINANCIAL_EDUCATION
-        elif any(word in user_input_lower for word in ["spending", "expense", "income"]):
-            return AnalysisType.INCOME_EXPENSE
+        # Simple keyword matching as fallback; first matching rule wins
+        for pattern, analysis_type in _FALLBACK_RULES:
+            if pattern.search(user_input):
+                return analysis_type
         
         return AnalysisType.COMPREHENSIVE
     
@@ -406,75 +620,46 @@ class MasterFinancialStrategistAgent:
         """Format user profile for synthesis prompt"""
         if not user_profile:
             return "No user profile available."
-            
-        lines = []
-        
-        # Basic info
-        if user_profile.get('age'):
-            lines.append(f"Age: {user_profile['age']}")
         
-        # Financial snapshot
-        income = user_profile.get('annual_income', 0)
-        expenses = user_profile.get('monthly_expenses', 0) * 12
-        savings = user_profile.get('savings', 0)
-        
-        lines.append(f"Annual Income: ₹{income:,.2f}")
-        lines.append(f"Annual Expenses: ₹{expenses:,.2f}")
-        lines.append(f"Current Savings: ₹{savings:,.2f}")
-        
-        # Debt summary
         debts = user_profile.get('debts', [])
-        if debts:
-            total_debt = sum(debt.get('balance', 0) for debt in debts)
-            lines.append(f"Total Debt: ₹{total_debt:,.2f}")
-        
-        # Goals
         goals = user_profile.get('financial_goals', [])
-        if goals:
-            goal_lines = []
-            for goal in goals:
-                goal_lines.append(f"  - {goal.get('name', 'Goal')}: ₹{goal.get('target', 0):,.2f} in {goal.get('timeline_months', 0)} months")
-            lines.append("Financial Goals:\n" + "\n".join(goal_lines))
         
-        return "\n".join(lines)
+        parts = (
+            # Basic info
+            user_profile.get('age') and f"Age: {user_profile['age']}",
+            # Financial snapshot
+            f"Annual Income: ₹{user_profile.get('annual_income', 0):,.2f}",
+            f"Annual Expenses: ₹{user_profile.get('monthly_expenses', 0) * 12:,.2f}",
+            f"Current Savings: ₹{user_profile.get('savings', 0):,.2f}",
+            # Debt summary
+            debts and f"Total Debt: ₹{sum(debt.get('balance', 0) for debt in debts):,.2f}",
+            # Goals
+            goals and "Financial Goals:\n" + "\n".join(
+                f"  - {goal.get('name', 'Goal')}: ₹{goal.get('target', 0):,.2f} in {goal.get('timeline_months', 0)} months"
+                for goal in goals
+            ),
+        )
+        
+        return "\n".join(x for x in parts if x)
     
     def _format_analyses_summary(self, analyses: Dict[str, Any]) -> str:
         """Format analyses into a concise summary for synthesis"""
-        summary_parts = []
-        
-        for analysis_type, analysis_data in analyses.items():
-            if analysis_data and not analysis_data.get('error'):
-                # Extract key insights from each analysis
-                key_insight = self._extract_key_insight(analysis_type, analysis_data)
-                if key_insight:
-                    summary_parts.append(f"• {analysis_type.replace('_', ' ').title()}: {key_insight}")
+        summary = "\n".join(
+            f"• {analysis_type.replace('_', ' ').title()}: {self._extract_key_insight(analysis_type, analysis_data)}"
+            for analysis_type, analysis_data in analyses.items()
+            if analysis_data and not analysis_data.get('error')
+        )
         
-        return "\n".join(summary_parts) if summary_parts else "No detailed analyses available"
+        return summary or "No detailed analyses available"
     
     def _extract_key_insight(self, analysis_type: str, analysis_data: Dict[str, Any]) -> str:
         """Extract the most important insight from each analysis"""
-        try:
-            if analysis_type == "income_analysis":
-                net_cash_flow = analysis_data.get('summary_metrics', {}).get('net_cash_flow', 0)
-                return f"Net cash flow: ₹{net_cash_flow:,.2f} monthly"
-            
-            elif analysis_type == "budget_plan":
-                savings_target = analysis_data.get('savings_target', 0)
-                return f"Recommended savings: ₹{savings_target:,.2f} monthly"
-            
-            elif analysis_type == "investment_advice":
-                risk_profile = analysis_data.get('risk_profile', 'moderate')
-                return f"Risk-appropriate {risk_profile} portfolio"
-            
-            elif analysis_type == "debt_optimization":
-                strategy = analysis_data.get('recommended_strategy', {}).get('recommended_method', 'snowball')
-                return f"Optimal strategy: {strategy} method"
-            
-            elif analysis_type == "financial_education":
-                return "Concept explanation provided"
-            
+        formatter = _KEY_INSIGHT_FORMATTERS.get(analysis_type)
+        if not formatter:
             return "Key insights available"
-            
+        
+        try:
+            return formatter(analysis_data)
         except Exception as e:
             logger.warning(f"Error extracting key insight for {analysis_type}: {str(e)}")
             return "Analysis completed"
@@ -510,15 +695,11 @@ class MasterFinancialStrategistAgent:
                 if total_debt:
                     metrics.append(f"Total Debt: ₹{total_debt:,.2f}")
         
-        return "\n".join(metrics) if metrics else "Key metrics being calculated..."
+        return "\n".join(metrics) if metrics else _NO_KEY_METRICS
     
     def _format_final_output(self, raw_plan: str, analyses: Dict[str, Any]) -> str:
         """Format the final synthesized plan with proper structure"""
         
-        # Add header and analysis sources
-        header = "🎯 YOUR COMPREHENSIVE FINANCIAL PLAN\n"
-        header += "=" * 60 + "\n\n"
-        
         # Add analysis sources footnote
         sources = []
         for analysis_type in analyses.keys():
@@ -530,43 +711,34 @@ class MasterFinancialStrategistAgent:
         else:
             footer = ""
         
-        return header + raw_plan + footer
+        return _PLAN_HEADER + raw_plan + footer
     
     def _create_fallback_plan(self, analyses: Dict[str, Any]) -> str:
         """Create a fallback plan when synthesis fails"""
         logger.warning("Creating fallback financial plan")
         
-        plan_parts = ["I've analyzed your financial situation and here are my key recommendations:"]
+        sections = (
+            self._fallback_section(analysis_type, analysis_data)
+            for analysis_type, analysis_data in analyses.items()
+            if analysis_data and not analysis_data.get('error')
+        )
         
-        for analysis_type, analysis_data in analyses.items():
-            if analysis_data and not analysis_data.get('error'):
-                if analysis_type == "income_analysis":
-                    plan_parts.append("\n💸 INCOME & EXPENSES:")
-                    net_flow = analysis_data.get('summary_metrics', {}).get('net_cash_flow', 0)
-                    if net_flow > 0:
-                        plan_parts.append(f"• You're saving ₹{net_flow:,.2f} monthly - great job!")
-                    else:
-                        plan_parts.append(f"• You're overspending by ₹{abs(net_flow):,.2f} monthly - let's fix this")
-                
-                elif analysis_type == "budget_plan":
-                    plan_parts.append("\n📊 BUDGET PLANNING:")
-                    savings_target = analysis_data.get('savings_target', 0)
-                    plan_parts.append(f"• Target monthly savings: ₹{savings_target:,.2f}")
-                
-                elif analysis_type == "investment_advice":
-                    plan_parts.append("\n📈 INVESTMENT STRATEGY:")
-                    risk_profile = analysis_data.get('risk_profile', 'moderate')
-                    plan_parts.append(f"• Recommended {risk_profile} risk portfolio")
-                
-                elif analysis_type == "debt_optimization":
-                    plan_parts.append("\n⚡ DEBT MANAGEMENT:")
-                    strategy = analysis_data.get('recommended_strategy', {}).get('recommended_method', 'snowball')
-                    plan_parts.append(f"• Use {strategy} method for fastest results")
-        
-        plan_parts.append("\n🚀 NEXT STEPS:")
-        plan_parts.append("1. Review your monthly spending patterns")
-        plan_parts.append("2. Set up automatic savings transfers")
-        plan_parts.append("3. Create a debt repayment schedule")
-        plan_parts.append("4. Start investing with your risk profile")
-        
-        return "\n".join(plan_parts)
\ No newline at end of file
+        return "\n".join(x for x in (_FALLBACK_INTRO, *sections, _FALLBACK_NEXT_STEPS) if x)
+    
+    def _fallback_section(self, analysis_type: str, analysis_data: Dict[str, Any]) -> str:
+        """Render the fallback-plan section for a single analysis"""
+        section = _FALLBACK_SECTIONS.get(analysis_type)
+        return section(analysis_data) if section else ""
+
+
+_master_agent: Optional[MasterFinancialStrategistAgent] = None
+_master_agent_lock = threading.Lock()
+
+def get_master_agent() -> MasterFinancialStrategistAgent:
+    """Return the process-wide master agent, creating it on first use"""
+    global _master_agent
+    if _master_agent is None:
+        with _master_agent_lock:
+            if _master_agent is None:
+                _master_agent = MasterFinancialStrategistAgent()
+    return _master_agent
\ No newline at end of file
@@ -1,29 +1,34 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 from typing import Dict, Any, List, Optional
 import uvicorn
 import logging
 from datetime import datetime
 from dotenv import load_dotenv
+import os
 import sys
-import io
+import asyncio
+import orjson
 from contextlib import asynccontextmanager
 import pandas as pd  # For serializer
 
-# Set UTF-8 encoding for Windows console to handle emojis
+# Set UTF-8 encoding for Windows console to handle emojis. reconfigure() updates the
+# existing streams in place, so re-imports (e.g. uvicorn workers) never stack wrappers.
 if sys.platform == "win32":
-    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
-    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+    for stream in (sys.stdout, sys.stderr):
+        if hasattr(stream, "reconfigure"):
+            stream.reconfigure(encoding='utf-8')
 
 # Load environment variables
 load_dotenv()
 
 # Import your existing modules
 from config import settings
+from config.settings import RateLimiter
 from graph.workflow import create_financial_workflow
-from graph.state import UserProfile, FinancialGoal
-from utils import setup_logging, ColorFormatter
+from utils import setup_logging, safe_json_dumps, ColorFormatter
 
 # Setup logging
 logger = setup_logging()
@@ -38,14 +43,55 @@ except ValueError as e:
 # Lifespan for startup (fixes deprecation)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global workflow
     logger.info("Initializing FinWise AI Core...")
-    workflow = create_financial_workflow()
+    # Build off the loop so the agents' client setup doesn't block startup
+    app.state.workflow = await asyncio.to_thread(create_financial_workflow)
     logger.info("AI Core ready!")
     yield
     logger.info("Shutting down FinWise AI Core...")
 
-app = FastAPI(title="FinWise AI Core", version="1.0.0", lifespan=lifespan)
+def _orjson_default(obj: Any) -> Any:
+    """Fallback for objects orjson cannot encode natively (pandas, models, plain objects)"""
+    try:
+        if isinstance(obj, pd.Series):
+            # Period/Timestamp indexes are not valid keys even with OPT_NON_STR_KEYS
+            return {str(k): v for k, v in obj.items()}
+        if isinstance(obj, pd.DataFrame):
+            return [{str(k): v for k, v in row.items()} for row in obj.to_dict(orient="records")]
+        if hasattr(obj, 'model_dump'):
+            return obj.model_dump()
+        if hasattr(obj, '__dict__'):
+            return obj.__dict__
+    except Exception:
+        pass  # Degrade just this value rather than failing the whole response
+    return str(obj)
+
+def _str_keys(obj: Any) -> Any:
+    """Copy of obj with every dict key stringified (retry path for unencodable keys)"""
+    if isinstance(obj, dict):
+        return {str(k): _str_keys(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_str_keys(v) for v in obj]
+    return obj
+
+_ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered by orjson, bypassing FastAPI's jsonable_encoder walk"""
+    
+    def render(self, content: Any) -> bytes:
+        try:
+            return orjson.dumps(content, default=_orjson_default, option=_ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            # Plain dicts keyed by e.g. Period never reach the default hook
+            return orjson.dumps(_str_keys(content), default=_orjson_default, option=_ORJSON_OPTIONS)
+
+app = FastAPI(
+    title="FinWise AI Core",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
+)
 
 # Add CORS middleware
 app.add_middleware(
@@ -56,32 +102,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-def _simplify_for_json(obj: Any) -> Any:
-    """Recursively simplify objects for JSON serialization (pandas-safe)"""
-    if obj is None:
-        return None
-    elif isinstance(obj, (str, int, float, bool)):
-        return obj
-    elif isinstance(obj, pd.Series):
-        return _simplify_for_json(obj.to_dict())
-    elif isinstance(obj, pd.DataFrame):
-        return [_simplify_for_json(row.to_dict()) for _, row in obj.iterrows()]
-    elif isinstance(obj, dict):
-        # === ENHANCED: Str keys to avoid unhashable ===
-        cleaned = {}
-        for k, v in obj.items():
-            str_k = str(k)
-            cleaned[str_k] = _simplify_for_json(v)
-        return cleaned
-    elif isinstance(obj, (list, tuple)):
-        return [_simplify_for_json(item) for item in obj]
-    elif hasattr(obj, 'model_dump'):
-        return _simplify_for_json(obj.model_dump())
-    elif hasattr(obj, '__dict__'):
-        return _simplify_for_json(obj.__dict__)
-    else:
-        return str(obj)
-
 # Request/Response Models (unchanged)
 class FinancialGoalRequest(BaseModel):
     name: str
@@ -116,6 +136,7 @@ class UserProfileRequest(BaseModel):
 class ProcessRequest(BaseModel):
     user_input: str
     user_profile: UserProfileRequest
+    include_details: bool = False  # Attach raw per-agent analyses to the response
 
 class WhatIfScenarioRequest(BaseModel):
     user_profile: UserProfileRequest
@@ -123,50 +144,102 @@ class WhatIfScenarioRequest(BaseModel):
     amount: float
     description: Optional[str] = ""
 
+class InsightOut(BaseModel):
+    agent: str
+    title: str
+    description: str
+    actionType: str
+
+class ProcessResponse(BaseModel):
+    success: bool
+    final_output: str
+    agent: str
+    actionType: Optional[str] = None
+    priority: str
+    insights: List[InsightOut] = []
+    analysis_type: str
+    agents_involved: List[str] = []
+    detailed_analysis: Dict[str, Any] = {}
+
+# Insight fields exposed to the client, with their fallback values
+_INSIGHT_DEFAULTS = (
+    ("agent", "unknown"),
+    ("title", "Insight"),
+    ("description", ""),
+    ("actionType", "review"),
+)
+
+# Workflow state keys paired with the agent that produces them
+_AGENT_KEYS = (
+    ("income_analysis", "income_expense_analyzer"),
+    ("budget_plan", "budget_planner"),
+    ("investment_advice", "investment_advisor"),
+    ("debt_optimization", "debt_optimizer"),
+    ("financial_education", "financial_educator"),
+)
+
+# What-if scenario helpers: each maps (amount, original_budget) to an impact dict
+_EXPENSE_ADJUSTMENTS = (("Entertainment", 0.3), ("Dining Out", 0.2), ("Shopping", 0.5))
+
+def _no_change_impact(amount: float, original_budget: float) -> Dict[str, Any]:
+    return {
+        "originalBudget": original_budget,
+        "newBudget": original_budget,
+        "savingsImpact": 0,
+        "goalDelay": 0,
+        "adjustments": []
+    }
+
+def _expense_impact(amount: float, original_budget: float) -> Dict[str, Any]:
+    return {
+        "originalBudget": original_budget,
+        "newBudget": original_budget - amount,
+        "savingsImpact": -amount,
+        "goalDelay": round(amount / (original_budget * 0.3)) if original_budget > 0 else 0,
+        "adjustments": [
+            {"category": category, "reduction": amount * share}
+            for category, share in _EXPENSE_ADJUSTMENTS
+        ] if amount > 1000 else []
+    }
+
+def _income_impact(amount: float, original_budget: float) -> Dict[str, Any]:
+    return {
+        "originalBudget": original_budget,
+        "newBudget": original_budget + amount,
+        "savingsImpact": amount * 0.7,
+        "goalDelay": -round(amount / (original_budget * 0.3)) if original_budget > 0 else 0,
+        "adjustments": []
+    }
+
+_SCENARIOS = {
+    "expense": _expense_impact,
+    "income": _income_impact,
+}
+
+# Constant health and error payloads, encoded once at import
+_HEALTH_BYTES = orjson.dumps({"status": "healthy", "service": "FinWise AI Core"})
+_ERR_BYTES = orjson.dumps({"detail": "Failed to process financial request"})
+_STREAM_ERR_LINE = safe_json_dumps({"event": "error", "detail": "Failed to process financial request"}) + "\n"
+
+# Full tracebacks are expensive to format; during an LLM outage log one every 10s at most
+_traceback_limiter = RateLimiter(calls_per_minute=6)
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "service": "FinWise AI Core"}
+    return Response(content=_HEALTH_BYTES, media_type="application/json")
 
-@app.post("/api/agents/process")
+@app.post("/api/agents/process", response_model=ProcessResponse)
 async def process_financial_request(request: ProcessRequest):
     """Main endpoint to process financial requests through multi-agent system"""
     try:
         logger.info(f"Processing request: {request.user_input[:100]}...")
         
-        user_profile_dict = request.user_profile.model_dump() if request.user_profile else None
-        
-        profile_instance = None
-        if user_profile_dict:
-            # Convert financial goals
-            goals = []
-            for goal in user_profile_dict.get('financial_goals', []):
-                goals.append(FinancialGoal(
-                    name=goal['name'],
-                    target=goal['target'],
-                    timeline_months=goal['timeline_months'],
-                    priority=goal.get('priority', 1)
-                ))
-            
-            # Create UserProfile instance
-            profile_instance = UserProfile(
-                age=user_profile_dict['age'],
-                annual_income=user_profile_dict['annual_income'],
-                monthly_expenses=user_profile_dict['monthly_expenses'],
-                savings=user_profile_dict['savings'],
-                debts=user_profile_dict['debts'],
-                financial_goals=goals,
-                risk_tolerance=user_profile_dict['risk_tolerance'],
-                investment_experience=user_profile_dict['investment_experience'],
-                time_horizon=user_profile_dict['time_horizon'],
-                transactions=user_profile_dict.get('transactions', [])
-            )
-            profile_data_for_workflow = profile_instance.model_dump()
-        else:
-            profile_data_for_workflow = None
+        # The workflow consumes plain dicts, so dump the already-validated request once
+        profile_data_for_workflow = request.user_profile.model_dump(mode='python') if request.user_profile else None
 
-        # Process through workflow
-        result = workflow.process_request(request.user_input, profile_data_for_workflow)
+        # The workflow runs its blocking agent nodes in worker threads
+        result = await app.state.workflow.process_request(request.user_input, profile_data_for_workflow)
         final_output = result.get("final_output", "")
         
         if isinstance(final_output, dict):
@@ -175,19 +248,15 @@ async def process_financial_request(request: ProcessRequest):
             action_type = final_output.get("actionType")
             priority = final_output.get("priority", "medium")
             
-            # Ensure insights is clean list of dicts
+            # Ensure insights is clean list of str-valued dicts (matches InsightOut; the
+            # ORJSONResponse below bypasses response_model validation)
             raw_insights = final_output.get("insights", [])
             insights = []
             if isinstance(raw_insights, list):
-                for item in raw_insights:
-                    if isinstance(item, dict):
-                        clean_insight = {
-                            "agent": str(item.get("agent", "unknown")),
-                            "title": str(item.get("title", "Insight")),
-                            "description": str(item.get("description", "")),
-                            "actionType": str(item.get("actionType", "review"))
-                        }
-                        insights.append(clean_insight)
+                insights = [
+                    {key: str(item.get(key, default)) for key, default in _INSIGHT_DEFAULTS}
+                    for item in raw_insights if isinstance(item, dict)
+                ]
         else:
             response_text = str(final_output)
             agent = "financial_educator"
@@ -196,34 +265,18 @@ async def process_financial_request(request: ProcessRequest):
             insights = []
         
         # Determine agents involved
-        agents_involved = []
-        if result.get("income_analysis"):
-            agents_involved.append("income_expense_analyzer")
-        if result.get("budget_plan"):
-            agents_involved.append("budget_planner")
-        if result.get("investment_advice"):
-            agents_involved.append("investment_advisor")
-        if result.get("debt_optimization"):
-            agents_involved.append("debt_optimizer")
-        if result.get("financial_education"):
-            agents_involved.append("financial_educator")
+        produced = [(key, name) for key, name in _AGENT_KEYS if result.get(key)]
+        agents_involved = [name for _, name in produced]
+        
+        # Raw analyses are only sent on request; they go straight to orjson and
+        # _orjson_default covers pandas and models
+        detailed_analysis = {key: result[key] for key, _ in produced} if request.include_details else {}
         
         if not agents_involved and agent:
             agents_involved = [agent]
         elif not agents_involved:
             agents_involved = ["master"]
         
-        # Simplify detailed analysis (enhanced for pandas)
-        detailed_analysis = {}
-        for key in ["income_analysis", "budget_plan", "investment_advice", "debt_optimization", "financial_education"]:
-            if result.get(key):
-                try:
-                    simplified = _simplify_for_json(result[key])
-                    detailed_analysis[key] = simplified
-                except Exception as e:
-                    logger.warning(f"Error simplifying {key}: {str(e)}")
-                    detailed_analysis[key] = {"error": str(e)}
-        
         # === FIX: Clean analysis_type (enum → str) ===
         analysis_raw = result.get("current_analysis", {}).get("type", "comprehensive")
         analysis_type = str(analysis_raw).split('.')[-1].lower() if hasattr(analysis_raw, 'name') else str(analysis_raw).lower()
@@ -240,11 +293,46 @@ async def process_financial_request(request: ProcessRequest):
             "detailed_analysis": detailed_analysis
         }
         
-        return response
+        return ORJSONResponse(content=response)
         
     except Exception as e:
-        logger.error(f"Error processing request: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
+        logger.error("Error processing request: %s", e, exc_info=_traceback_limiter.try_acquire())
+        return Response(content=_ERR_BYTES, status_code=500, media_type="application/json")
+
+@app.post("/api/agents/process/stream")
+async def stream_comprehensive_plan(request: ProcessRequest):
+    """Stream a comprehensive plan as newline-delimited JSON events"""
+    logger.info("Streaming comprehensive plan for: %s...", request.user_input[:100])
+    
+    user_profile_dict = request.user_profile.model_dump()
+    
+    async def event_stream():
+        try:
+            async for event in app.state.workflow.stream_comprehensive(request.user_input, user_profile_dict):
+                yield safe_json_dumps(event) + "\n"
+        except Exception as e:
+            logger.error("Error streaming plan: %s", e, exc_info=_traceback_limiter.try_acquire())
+            yield _STREAM_ERR_LINE
+    
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+@app.post("/api/agents/process/live")
+async def stream_financial_request(request: ProcessRequest):
+    """Run any request through the agent graph, streaming the synthesized plan's tokens
+    as newline-delimited JSON events (``node``, ``chunk``, then ``done``)"""
+    logger.info("Streaming request: %s...", request.user_input[:100])
+    
+    profile_data = request.user_profile.model_dump(mode='python') if request.user_profile else None
+    
+    async def event_stream():
+        try:
+            async for event in app.state.workflow.stream_plan(request.user_input, profile_data):
+                yield safe_json_dumps(event) + "\n"
+        except Exception as e:
+            logger.error("Error streaming request: %s", e, exc_info=_traceback_limiter.try_acquire())
+            yield _STREAM_ERR_LINE
+    
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
 
 @app.post("/api/agents/what-if-scenario")
 async def process_what_if_scenario(request: WhatIfScenarioRequest):
@@ -254,85 +342,71 @@ async def process_what_if_scenario(request: WhatIfScenarioRequest):
         
         original_budget = user_profile_dict['annual_income'] / 12 - user_profile_dict['monthly_expenses']
         
-        impact = {
-            "originalBudget": original_budget,
-            "newBudget": original_budget,
-            "savingsImpact": 0,
-            "goalDelay": 0,
-            "adjustments": []
-        }
-        
-        if request.scenario_type == "expense":
-            impact["newBudget"] = original_budget - request.amount
-            impact["savingsImpact"] = -request.amount
-            impact["goalDelay"] = round(request.amount / (original_budget * 0.3)) if original_budget > 0 else 0
-            
-            if request.amount > 1000:
-                impact["adjustments"] = [
-                    {"category": "Entertainment", "reduction": request.amount * 0.3},
-                    {"category": "Dining Out", "reduction": request.amount * 0.2},
-                    {"category": "Shopping", "reduction": request.amount * 0.5}
-                ]
-        
-        elif request.scenario_type == "income":
-            impact["newBudget"] = original_budget + request.amount
-            impact["savingsImpact"] = request.amount * 0.7
-            impact["goalDelay"] = -round(request.amount / (original_budget * 0.3)) if original_budget > 0 else 0
-        
-        return impact
+        impact_fn = _SCENARIOS.get(request.scenario_type, _no_change_impact)
+        return impact_fn(request.amount, original_budget)
         
     except Exception as e:
-        logger.error(f"Error processing scenario: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+        logger.error("Error processing scenario: %s", e, exc_info=_traceback_limiter.try_acquire())
+        return Response(content=_ERR_BYTES, status_code=500, media_type="application/json")
 
 @app.post("/api/agents/budget")
 async def get_budget_recommendations(request: UserProfileRequest):
     """Get budget recommendations"""
     try:
-        from agents.budget_planner import BudgetPlannerAgent
-        agent = BudgetPlannerAgent()
+        agent = app.state.workflow.budget_planner
         user_profile_dict = request.model_dump()
-        budget_plan = agent.create_budget_plan(user_profile_dict)
-        return {
+        budget_plan = await asyncio.to_thread(agent.create_budget_plan, user_profile_dict)
+        return ORJSONResponse(content={
             "success": True,
-            "budget_plan": _simplify_for_json(budget_plan)
-        }
+            "budget_plan": budget_plan
+        })
     except Exception as e:
-        logger.error(f"Error creating budget: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+        logger.error("Error creating budget: %s", e, exc_info=_traceback_limiter.try_acquire())
+        return Response(content=_ERR_BYTES, status_code=500, media_type="application/json")
 
 @app.post("/api/agents/investment")
 async def get_investment_advice(request: UserProfileRequest):
     """Get investment recommendations"""
     try:
-        from agents.investment_advisor import InvestmentAdvisorAgent
-        agent = InvestmentAdvisorAgent()
+        agent = app.state.workflow.investment_advisor
         user_profile_dict = request.model_dump()
-        investment_advice = agent.provide_advice(user_profile_dict)
-        return {
+        investment_advice = await asyncio.to_thread(agent.provide_advice, user_profile_dict)
+        return ORJSONResponse(content={
             "success": True,
-            "investment_advice": _simplify_for_json(investment_advice)
-        }
+            "investment_advice": investment_advice
+        })
     except Exception as e:
-        logger.error(f"Error generating investment advice: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+        logger.error("Error generating investment advice: %s", e, exc_info=_traceback_limiter.try_acquire())
+        return Response(content=_ERR_BYTES, status_code=500, media_type="application/json")
 
 @app.post("/api/agents/debt")
 async def optimize_debt(request: UserProfileRequest):
     """Get debt optimization strategy"""
     try:
-        from agents.debt_optimizer import DebtOptimizerAgent
-        agent = DebtOptimizerAgent()
+        agent = app.state.workflow.debt_optimizer
         user_profile_dict = request.model_dump()
         debts = user_profile_dict.get('debts', [])
-        debt_plan = agent.optimize_repayment(debts, user_profile_dict)
-        return {
+        debt_plan = await asyncio.to_thread(agent.optimize_repayment, debts, user_profile_dict)
+        return ORJSONResponse(content={
             "success": True,
-            "debt_plan": _simplify_for_json(debt_plan)
-        }
+            "debt_plan": debt_plan
+        })
     except Exception as e:
-        logger.error(f"Error optimizing debt: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+        logger.error("Error optimizing debt: %s", e, exc_info=_traceback_limiter.try_acquire())
+        return Response(content=_ERR_BYTES, status_code=500, media_type="application/json")
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
+    # Workers need an import string; each one builds its own workflow in lifespan.
+    # Rate limiters, singletons and the LLM cache are per process, so extra workers
+    # multiply the effective Gemini rate limit: opt in with AI_CORE_WORKERS.
+    # "auto" picks uvloop/httptools when installed (uvicorn[standard]) and falls back to
+    # asyncio/h11 elsewhere (Windows, PyPy, plain uvicorn).
+    uvicorn.run(
+        "api_service:app",
+        host="0.0.0.0",
+        port=8001,
+        workers=int(os.getenv("AI_CORE_WORKERS", "1")),
+        loop="auto",
+        http="auto",
+        log_level="warning"
+    )
\ No newline at end of file
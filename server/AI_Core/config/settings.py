@@ -15,12 +15,28 @@ class Settings:
     
     # Model Configuration
     MODEL_NAME = "gemini-2.0-flash"
+    
+    # LLM response cache. Prompts embed users' full financial profiles and transactions,
+    # so the default is a bounded per-process in-memory cache. Setting FINWISE_LLM_CACHE
+    # to a file path opts into a persistent SQLite cache (needs langchain-community);
+    # that file has no size limit or expiry and holds PII, so keep it outside the
+    # checkout on protected storage and prune or delete it yourself.
+    LLM_CACHE_PATH = os.getenv("FINWISE_LLM_CACHE") or None
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv("FINWISE_LLM_CACHE_MAX_ENTRIES", "256"))
     TEMPERATURE = 0.1
     MAX_TOKENS = 4096
     
     # Agent Configuration
     AGENT_CONFIG = {
-        "master": {"temperature": 0.1, "max_tokens": 2048},
+        "master": {
+            "temperature": 0.1,
+            "max_tokens": 2048,
+            "synth_model": MODEL_NAME,
+            # Six-way routing only needs a small model and a one-field JSON answer
+            "classify_model": "gemini-2.0-flash-lite",
+            "classify_temperature": 0.0,
+            "classify_max_tokens": 16
+        },
         "analyzer": {"temperature": 0.1, "max_tokens": 1024},
         "planner": {"temperature": 0.1, "max_tokens": 1024},
         "advisor": {"temperature": 0.1, "max_tokens": 1024},
@@ -63,6 +79,14 @@ class RateLimiter:
             time.sleep(sleep_time)
         
         self.last_call_time = time.time()
+    
+    def try_acquire(self) -> bool:
+        """Non-waiting check: consume a slot and return True if one is free"""
+        current_time = time.time()
+        if current_time - self.last_call_time < self.min_interval:
+            return False
+        self.last_call_time = current_time
+        return True
 
 # Add to your Settings class or use separately
 rate_limiter = RateLimiter(calls_per_minute=8)  # Conservative limit
\ No newline at end of file
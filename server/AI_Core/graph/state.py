@@ -1,21 +1,27 @@
-from typing import TypedDict, List, Dict, Any, Optional, Annotated
+from typing import List, Dict, Any, Optional, Annotated
+from dataclasses import dataclass, field
 from pydantic import BaseModel, Field
 from enum import Enum
 
-class AgentState(TypedDict):
+def _latest(current: Any, update: Any) -> Any:
+    """Reducer that keeps the newest write, so parallel branches may all set the key"""
+    return update
+
+@dataclass(slots=True)
+class AgentState:
     """State for the multi-agent financial system"""
-    user_input: str
-    user_profile: Dict[str, Any]
-    conversation_history: List[Dict[str, str]]
-    current_analysis: Dict[str, Any]
-    income_analysis: Optional[Dict[str, Any]]
-    budget_plan: Optional[Dict[str, Any]]
-    investment_advice: Optional[Dict[str, Any]]
-    debt_optimization: Optional[Dict[str, Any]]
-    financial_education: Optional[str]
-    next_agent: str
-    final_output: Optional[str]
-    error: Optional[str]
+    user_input: str = ""
+    user_profile: Optional[Dict[str, Any]] = None
+    conversation_history: List[Dict[str, str]] = field(default_factory=list)
+    current_analysis: Dict[str, Any] = field(default_factory=dict)
+    income_analysis: Optional[Dict[str, Any]] = None
+    budget_plan: Optional[Dict[str, Any]] = None
+    investment_advice: Optional[Dict[str, Any]] = None
+    debt_optimization: Optional[Dict[str, Any]] = None
+    financial_education: Optional[str] = None
+    next_agent: Annotated[str, _latest] = "master_agent"
+    final_output: Optional[str] = None
+    error: Optional[str] = None
 
 class AnalysisType(str, Enum):
     INCOME_EXPENSE = "income_expense"
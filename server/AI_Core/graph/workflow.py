@@ -1,47 +1,100 @@
 # In graph/workflow.py
 
 from langgraph.graph import StateGraph, END
-from typing import Dict, Any, Optional
+from langgraph.types import Send
+from langchain_core.runnables import RunnableConfig
+from typing import Dict, Any, Optional, AsyncIterator
+import asyncio
 import logging
+import threading
+from functools import cached_property
+from types import MappingProxyType
 
 from .state import AgentState, AnalysisType
 
 logger = logging.getLogger(__name__)
 
+__all__ = ["FinancialWorkflow", "create_financial_workflow"]
+
+# Specialist nodes fanned out in parallel for a comprehensive analysis
+_SPECIALIST_NODES = ("income_analyzer", "budget_planner", "investment_advisor", "debt_optimizer")
+
+# Analysis type -> node that handles it (comprehensive fans out instead)
+_ROUTE_MAP = MappingProxyType({
+    AnalysisType.INCOME_EXPENSE: "income_analyzer",
+    AnalysisType.BUDGET_PLANNING: "budget_planner",
+    AnalysisType.INVESTMENT_ADVICE: "investment_advisor",
+    AnalysisType.DEBT_OPTIMIZATION: "debt_optimizer",
+    AnalysisType.FINANCIAL_EDUCATION: "financial_educator",
+})
+
+# State keys the specialists write and synthesize reads
+_ANALYSIS_KEYS = ("income_analysis", "budget_plan", "investment_advice", "debt_optimization")
+
+def _dispatch(method_name: str):
+    """Graph node that forwards to the FinancialWorkflow passed in the run config.
+
+    Nodes are looked up per run instead of bound at build time, which lets a single
+    compiled graph serve every FinancialWorkflow instance.
+    """
+    def node(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
+        return getattr(config["configurable"]["workflow"], method_name)(state)
+
+    node.__name__ = method_name
+    return node
+
 class FinancialWorkflow:
     """Orchestrates the multi-agent financial workflow"""
 
     def __init__(self):
-        # Import agents inside the method to avoid circular imports
-        from agents.master_agent import MasterFinancialStrategistAgent
+        self.workflow = _COMPILED_GRAPH
+
+    # Agents are built on first use (imports stay local to avoid circular imports), so a
+    # request that only visits one or two specialists never constructs the others
+
+    @cached_property
+    def master_agent(self):
+        from agents.master_agent import get_master_agent
+        return get_master_agent()
+
+    @cached_property
+    def income_analyzer(self):
         from agents.income_expense_analyzer import IncomeExpenseAnalyzerAgent
+        return IncomeExpenseAnalyzerAgent()
+
+    @cached_property
+    def budget_planner(self):
         from agents.budget_planner import BudgetPlannerAgent
+        return BudgetPlannerAgent()
+
+    @cached_property
+    def investment_advisor(self):
         from agents.investment_advisor import InvestmentAdvisorAgent
-        from agents.debt_optimizer import DebtOptimizerAgent
-        from agents.financial_educator import FinancialEducatorAgent
+        return InvestmentAdvisorAgent()
 
-        self.master_agent = MasterFinancialStrategistAgent()
-        self.income_analyzer = IncomeExpenseAnalyzerAgent()
-        self.budget_planner = BudgetPlannerAgent()
-        self.investment_advisor = InvestmentAdvisorAgent()
-        self.debt_optimizer = DebtOptimizerAgent()
-        self.financial_educator = FinancialEducatorAgent()
+    @cached_property
+    def debt_optimizer(self):
+        from agents.debt_optimizer import DebtOptimizerAgent
+        return DebtOptimizerAgent()
 
-        self.workflow = self._build_workflow()
+    @cached_property
+    def financial_educator(self):
+        from agents.financial_educator import FinancialEducatorAgent
+        return FinancialEducatorAgent()
 
-    def _build_workflow(self) -> StateGraph:
-        """Build the LangGraph workflow"""
+    @staticmethod
+    def _build_workflow() -> StateGraph:
+        """Build and compile the LangGraph workflow (done once per process)"""
         workflow = StateGraph(AgentState)
 
         # Add nodes for each agent
-        workflow.add_node("master_agent", self._master_agent_node)
-        workflow.add_node("income_analyzer", self._income_analyzer_node)
-        workflow.add_node("budget_planner", self._budget_planner_node)
-        workflow.add_node("investment_advisor", self._investment_advisor_node)
-        workflow.add_node("debt_optimizer", self._debt_optimizer_node)
-        workflow.add_node("financial_educator", self._financial_educator_node)
-        workflow.add_node("comprehensive_analysis", self._comprehensive_analysis_node)
-        workflow.add_node("synthesize", self._synthesize_node)
+        workflow.add_node("master_agent", _dispatch("_master_agent_node"))
+        workflow.add_node("income_analyzer", _dispatch("_income_analyzer_node"))
+        workflow.add_node("budget_planner", _dispatch("_budget_planner_node"))
+        workflow.add_node("investment_advisor", _dispatch("_investment_advisor_node"))
+        workflow.add_node("debt_optimizer", _dispatch("_debt_optimizer_node"))
+        workflow.add_node("financial_educator", _dispatch("_financial_educator_node"))
+        workflow.add_node("synthesize", _dispatch("_synthesize_node"))
 
         # Set entry point
         workflow.set_entry_point("master_agent")
@@ -49,16 +102,8 @@ class FinancialWorkflow:
         # Define conditional routing
         workflow.add_conditional_edges(
             "master_agent",
-            self._route_based_on_analysis,
-            {
-                AnalysisType.INCOME_EXPENSE: "income_analyzer",
-                AnalysisType.BUDGET_PLANNING: "budget_planner",
-                AnalysisType.INVESTMENT_ADVICE: "investment_advisor",
-                AnalysisType.DEBT_OPTIMIZATION: "debt_optimizer",
-                AnalysisType.FINANCIAL_EDUCATION: "financial_educator",
-                AnalysisType.COMPREHENSIVE: "comprehensive_analysis",
-                "end": END,
-            },
+            FinancialWorkflow._route_based_on_analysis,
+            list(_ROUTE_MAP.values()),
         )
 
         # Connect all specialist agents (EXCEPT EDUCATOR) to synthesize
@@ -66,7 +111,6 @@ class FinancialWorkflow:
         workflow.add_edge("budget_planner", "synthesize")
         workflow.add_edge("investment_advisor", "synthesize")
         workflow.add_edge("debt_optimizer", "synthesize")
-        workflow.add_edge("comprehensive_analysis", "synthesize")
 
         # Educator goes directly to end
         workflow.add_edge("financial_educator", END)
@@ -80,8 +124,8 @@ class FinancialWorkflow:
         """Master agent determines analysis type"""
         logger.info("Master agent processing user request")
 
-        user_input = state.get("user_input", "")
-        user_profile = state.get("user_profile")
+        user_input = state.user_input
+        user_profile = state.user_profile
 
         analysis_type = self.master_agent.determine_analysis_type(user_input, user_profile)
 
@@ -97,18 +141,27 @@ class FinancialWorkflow:
             "next_agent": analysis_type,
         }
 
-    def _route_based_on_analysis(self, state: AgentState) -> str:
-        """Route to appropriate agent based on analysis type"""
-        analysis_type = state.get("current_analysis", {}).get("type")
-        if not state.get("user_profile") and analysis_type == AnalysisType.COMPREHENSIVE:
-            return AnalysisType.FINANCIAL_EDUCATION
-        return analysis_type or AnalysisType.COMPREHENSIVE
+    @staticmethod
+    def _route_based_on_analysis(state: AgentState):
+        """Route to appropriate agent based on analysis type.
+
+        Comprehensive requests fan out to every specialist as parallel branches via Send;
+        LangGraph waits for all of them before running synthesize.
+        """
+        # Every agent but the educator needs a profile and would only return an error dict
+        # (plus a synthesize LLM call), so profile-less requests are answered by the educator
+        if not state.user_profile:
+            return "financial_educator"
+        analysis_type = state.current_analysis.get("type") or AnalysisType.COMPREHENSIVE
+        if analysis_type == AnalysisType.COMPREHENSIVE:
+            return [Send(node, state) for node in _SPECIALIST_NODES]
+        return _ROUTE_MAP.get(analysis_type, "financial_educator")
 
     def _income_analyzer_node(self, state: AgentState) -> Dict[str, Any]:
         """Income and expense analysis"""
         logger.info("Income analyzer processing request")
 
-        user_profile = state.get("user_profile")
+        user_profile = state.user_profile
         if not user_profile:
             logger.warning("No user profile to analyze income/expenses.")
             return {"income_analysis": {"error": "No user profile data available."}}
@@ -122,7 +175,7 @@ class FinancialWorkflow:
         """Budget planning"""
         logger.info("Budget planner processing request")
 
-        user_profile = state.get("user_profile")
+        user_profile = state.user_profile
         if not user_profile:
             logger.warning("No user profile to create budget.")
             return {"budget_plan": {"error": "No user profile data available."}}
@@ -134,7 +187,7 @@ class FinancialWorkflow:
         """Investment advice"""
         logger.info("Investment advisor processing request")
 
-        user_profile = state.get("user_profile")
+        user_profile = state.user_profile
         if not user_profile:
             logger.warning("No user profile to provide investment advice.")
             return {"investment_advice": {"error": "No user profile data available."}}
@@ -146,7 +199,7 @@ class FinancialWorkflow:
         """Debt optimization"""
         logger.info("Debt optimizer processing request")
 
-        user_profile = state.get("user_profile")
+        user_profile = state.user_profile
         if not user_profile:
             logger.warning("No user profile to optimize debt.")
             return {"debt_optimization": {"error": "No user profile data available."}}
@@ -159,22 +212,26 @@ class FinancialWorkflow:
         """Financial education — terminal node"""
         logger.info("Financial educator processing request")
 
-        user_input = state.get("user_input", "")
-        user_profile = state.get("user_profile")
+        user_input = state.user_input
+        user_profile = state.user_profile
 
         result = self.financial_educator.explain_concept(user_input, user_profile)
 
         final_answer = result.get("error") or result.get("explanation", "")
         return {"financial_education": result, "final_output": final_answer}
 
-    def _comprehensive_analysis_node(self, state: AgentState) -> Dict[str, Any]:
-        """Run all specialist agents for a comprehensive plan"""
-        logger.info("Running comprehensive analysis node (calling all specialists)...")
-
-        income_state = self._income_analyzer_node(state)
-        budget_state = self._budget_planner_node(state)
-        investment_state = self._investment_advisor_node(state)
-        debt_state = self._debt_optimizer_node(state)
+    async def _run_specialists(self, state: AgentState) -> Dict[str, Any]:
+        """Run all specialist agents concurrently outside the graph (used for streaming)"""
+        logger.info("Running all specialists for a streamed comprehensive plan...")
+
+        # The specialists only read user_profile and write disjoint keys, so the four
+        # blocking LLM calls can overlap instead of running back to back
+        income_state, budget_state, investment_state, debt_state = await asyncio.gather(
+            asyncio.to_thread(self._income_analyzer_node, state),
+            asyncio.to_thread(self._budget_planner_node, state),
+            asyncio.to_thread(self._investment_advisor_node, state),
+            asyncio.to_thread(self._debt_optimizer_node, state),
+        )
 
         return {
             "income_analysis": income_state.get("income_analysis"),
@@ -187,47 +244,90 @@ class FinancialWorkflow:
         """Combine all analyses into final plan"""
         logger.info("Synthesizing final financial plan")
 
-        user_profile = state.get("user_profile")
-        analyses = {
-            "income_analysis": state.get("income_analysis"),
-            "budget_plan": state.get("budget_plan"),
-            "investment_advice": state.get("investment_advice"),
-            "debt_optimization": state.get("debt_optimization"),
-        }
-
-        valid_analyses = {k: v for k, v in analyses.items() if v}
+        user_profile = state.user_profile
+        valid_analyses = {key: value for key in _ANALYSIS_KEYS if (value := getattr(state, key))}
         final_plan = self.master_agent.synthesize_plan(user_profile, valid_analyses)
 
         return {"final_output": final_plan, "next_agent": "end"}
 
-    def process_request(self, user_input: str, user_profile: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    async def process_request(self, user_input: str, user_profile: Optional[Dict[str, Any]]) -> Dict[str, Any]:
         """Process user request through the workflow"""
-        initial_state = AgentState(
-            user_input=user_input,
-            user_profile=user_profile,
-            conversation_history=[],
-            current_analysis={},
-            income_analysis=None,
-            budget_plan=None,
-            investment_advice=None,
-            debt_optimization=None,
-            financial_education=None,
-            next_agent="master_agent",
-            final_output=None,
-            error=None,
-        )
+        initial_state = AgentState(user_input=user_input, user_profile=user_profile)
 
         try:
-            result = self.workflow.invoke(initial_state)
+            result = await self.workflow.ainvoke(initial_state, {"configurable": {"workflow": self}})
             return result
         except Exception as e:
-            logger.error(f"Workflow execution failed: {str(e)}")
+            logger.error("Workflow execution failed: %s", e)
             return {
                 "final_output": f"I encountered an error while processing your request: {str(e)}",
                 "error": str(e),
             }
 
+    async def stream_request(self, user_input: str,
+                             user_profile: Optional[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+        """Yield ``{node_name: state_update}`` as each node finishes, so callers can show progress"""
+        initial_state = AgentState(user_input=user_input, user_profile=user_profile)
+
+        async for update in self.workflow.astream(
+            initial_state, {"configurable": {"workflow": self}}, stream_mode="updates"
+        ):
+            yield update
+
+    async def stream_plan(self, user_input: str,
+                          user_profile: Optional[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+        """Run the full graph, forwarding synthesis tokens as they are generated.
+
+        Yields ``node`` events as nodes finish, ``chunk`` events carrying the raw tokens of
+        the synthesize node's LLM call, and a final ``done`` event with the same
+        ``final_output`` that ``process_request`` returns.
+        """
+        initial_state = AgentState(user_input=user_input, user_profile=user_profile)
+        final_output: Any = None
+
+        # "messages" mode surfaces every chat-model token emitted inside a node; only the
+        # synthesize node's tokens belong to the plan (the router and specialists also call
+        # the LLM)
+        async for mode, payload in self.workflow.astream(
+            initial_state, {"configurable": {"workflow": self}}, stream_mode=["messages", "updates"]
+        ):
+            if mode == "messages":
+                message, metadata = payload
+                if metadata.get("langgraph_node") == "synthesize" and message.content:
+                    yield {"event": "chunk", "content": message.content}
+                continue
+
+            for node_name, node_update in payload.items():
+                yield {"event": "node", "node": node_name}
+                if node_update and "final_output" in node_update:
+                    final_output = node_update["final_output"]
+
+        yield {"event": "done", "final_output": final_output}
+
+    async def stream_comprehensive(self, user_input: str,
+                                   user_profile: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Run all specialists, then stream a fused classify+synthesize plan from the master agent"""
+        analyses = await self._run_specialists(
+            AgentState(user_input=user_input, user_profile=user_profile)
+        )
+
+        async for event in self.master_agent.oneshot_comprehensive(user_input, user_profile, analyses):
+            yield event
+
+_COMPILED_GRAPH = FinancialWorkflow._build_workflow()
+
+_workflow: Optional[FinancialWorkflow] = None
+_workflow_lock = threading.Lock()
 
 def create_financial_workflow() -> FinancialWorkflow:
-    """Factory to create workflow instance"""
-    return FinancialWorkflow()
+    """Return the process-wide workflow, creating it (and the LLM cache) on first use"""
+    global _workflow
+    if _workflow is None:
+        with _workflow_lock:
+            if _workflow is None:
+                from config import settings
+                from utils import setup_llm_cache
+
+                setup_llm_cache(settings.LLM_CACHE_PATH, settings.LLM_CACHE_MAX_ENTRIES)
+                _workflow = FinancialWorkflow()
+    return _workflow
@@ -1,5 +1,7 @@
 import os
+import asyncio
 import logging
+import threading
 from dotenv import load_dotenv
 
 # Load environment variables first
@@ -32,6 +34,15 @@ from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 # === END ADDED ===
 
+# Workflow state keys paired with the label shown for the agent that produced them
+_AGENT_LABELS = (
+    ("income_analysis", "💰 Income Analyzer"),
+    ("budget_plan", "📝 Budget Planner"),
+    ("investment_advice", "📈 Investment Advisor"),
+    ("debt_optimization", "⚡ Debt Optimizer"),
+    ("financial_education", "🎓 Financial Educator"),
+)
+
 def create_sample_user_profile() -> UserProfile:
     """Create a sample user profile for demonstration"""
     
@@ -83,6 +94,25 @@ def create_sample_user_profile() -> UserProfile:
         transactions=transactions
     )
 
+async def _run_with_progress(workflow, user_input: str, profile_data) -> dict:
+    """Stream the workflow, reporting each agent as it finishes, and return the merged state"""
+    result = {}
+    async for update in workflow.stream_request(user_input, profile_data):
+        for node_name, node_update in update.items():
+            print(ColorFormatter.info(f"✓ {node_name} done"))
+            result.update(node_update or {})
+    return result
+
+def _warm_up(workflow, router_chain) -> None:
+    """Pay one-time setup costs (agent construction, TLS handshake) off the input loop"""
+    try:
+        for agent_name in ("master_agent", "income_analyzer", "budget_planner",
+                           "investment_advisor", "debt_optimizer", "financial_educator"):
+            getattr(workflow, agent_name)
+        router_chain.invoke({"question": "ping"})
+    except Exception as e:
+        logging.getLogger(__name__).debug(f"Warm-up skipped: {str(e)}")
+
 def main():
     """Main application function"""
     
@@ -124,8 +154,12 @@ Question: {question}"""
     try:
         workflow = create_financial_workflow()
         
-        # Create sample user profile
+        # Build the agents and open the Gemini connection while the welcome text is read
+        threading.Thread(target=_warm_up, args=(workflow, router_chain), daemon=True).start()
+        
+        # Create sample user profile (dumped once; every request reuses the same dict)
         user_profile = create_sample_user_profile()
+        user_profile_data = user_profile.model_dump()
         
         print(ColorFormatter.success("\nWelcome to your AI Financial Assistant!"))
         print(ColorFormatter.info("I can help you with:"))
@@ -161,7 +195,7 @@ Question: {question}"""
                 
                 if "user_specific" in request_type.lower():
                     print(ColorFormatter.info("...Analyzing your request with your personal profile."))
-                    profile_data = user_profile.model_dump()
+                    profile_data = user_profile_data
                 else:
                     print(ColorFormatter.info("...Analyzing your general finance question."))
                     # profile_data remains None, as intended
@@ -169,14 +203,14 @@ Question: {question}"""
             except Exception as e:
                 print(ColorFormatter.error(f"❌ Error during request classification: {str(e)}"))
                 print(ColorFormatter.warning("Defaulting to user-specific analysis."))
-                profile_data = user_profile.model_dump()
+                profile_data = user_profile_data
             # === END ADDED ===
                 
             print(ColorFormatter.info("🧠 Processing with AI agents..."))
             
             try:
                 # === MODIFIED: Pass the (potentially None) profile_data ===
-                result = workflow.process_request(user_input, profile_data)
+                result = asyncio.run(_run_with_progress(workflow, user_input, profile_data))
                 
                 final_output = result.get("final_output", "I apologize, but I couldn't generate a response.")
                 
@@ -186,17 +220,7 @@ Question: {question}"""
                 print("=" * 60)
                 
                 # Show which agents were involved
-                involved_agents = []
-                if result.get("income_analysis"):
-                    involved_agents.append("💰 Income Analyzer")
-                if result.get("budget_plan"):
-                    involved_agents.append("📝 Budget Planner") 
-                if result.get("investment_advice"):
-                    involved_agents.append("📈 Investment Advisor")
-                if result.get("debt_optimization"):
-                    involved_agents.append("⚡ Debt Optimizer")
-                if result.get("financial_education"):
-                    involved_agents.append("🎓 Financial Educator")
+                involved_agents = [label for key, label in _AGENT_LABELS if result.get(key)]
                 
                 if involved_agents:
                     print(ColorFormatter.info(f"\nSpecialized agents involved: {', '.join(involved_agents)}"))
@@ -0,0 +1,53 @@
+"""Run from server/AI_Core with: python -m unittest discover tests"""
+
+import unittest
+from unittest import mock
+
+from tools import data_processors
+from tools.data_processors import DataProcessor
+
+# Plain dates, timestamps and offsets mixed in one statement, plus a missing date
+MIXED_ISO_TRANSACTIONS = [
+    {"date": "2025-01-05", "category": "Food", "amount": -10.0, "description": "a"},
+    {"date": "2025-01-05 10:00", "category": "Food", "amount": -5.0, "description": "b"},
+    {"date": "2025-02-01T23:30:00+05:30", "category": "Rent", "amount": -100.0, "description": "c"},
+    {"date": "2025-02-03T01:00:00Z", "category": "Food", "amount": -2.5, "description": "d"},
+    {"date": None, "category": "Rent", "amount": -7.0, "description": "e"},
+    {"date": "2025-02-04", "category": "Salary", "amount": 500.0, "description": "f"},
+]
+
+
+@unittest.skipIf(data_processors.pl is None, "polars is not installed")
+class SpendingTrendEnginesTest(unittest.TestCase):
+    """The Polars and pandas engines must agree, so results never depend on whether
+    polars happens to be installed"""
+
+    def _both_engines(self, transactions, period):
+        with_polars = DataProcessor.analyze_spending_trends(transactions, period)
+        with mock.patch.object(data_processors, "pl", None):
+            with_pandas = DataProcessor.analyze_spending_trends(transactions, period)
+        return with_polars, with_pandas
+
+    def test_mixed_iso_formats_match(self):
+        for period in ("monthly", "category"):
+            with_polars, with_pandas = self._both_engines(MIXED_ISO_TRANSACTIONS, period)
+            self.assertEqual(with_polars, with_pandas)
+
+        with_polars, _ = self._both_engines(MIXED_ISO_TRANSACTIONS, "monthly")
+        self.assertEqual(with_polars["trends"], {
+            "2025-01": {"Food": 15.0, "Rent": 0.0},
+            "2025-02": {"Food": 2.5, "Rent": 100.0},
+        })
+        self.assertEqual(with_polars["summary"]["total_spending"], 124.5)
+
+    def test_non_iso_dates_match(self):
+        transactions = [
+            {"date": "01/02/2024", "category": "Food", "amount": -1.0, "description": "a"},
+            {"date": "03/02/2024", "category": "Food", "amount": -2.0, "description": "b"},
+        ]
+        with_polars, with_pandas = self._both_engines(transactions, "monthly")
+        self.assertEqual(with_polars, with_pandas)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,11 +1,31 @@
+import numpy as np
 import pandas as pd
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+from collections import defaultdict
 from datetime import datetime
 import json
 import logging
+import re
+
+try:
+    import polars as pl
+except ImportError:  # Optional: analyze_spending_trends falls back to pandas
+    pl = None
 
 logger = logging.getLogger(__name__)
 
+# Dates both spending-trend engines parse themselves: YYYY-MM-DD, optionally followed
+# by a time and UTC offset. The month comes from the written (wall-clock) date.
+_ISO_DATE_PATTERN = r'^\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?)?$'
+
+# Rows per DataFrame when aggregating large transaction lists with pandas
+_CHUNK_SIZE = 100_000
+
+# Transaction-type keyword rules, matched case-insensitively against descriptions
+_INCOME_RE = re.compile(r'salary|deposit|income|payment', re.IGNORECASE)
+_INVESTMENT_RE = re.compile(r'investment|stock|etf|mutual', re.IGNORECASE)
+_TRANSFER_RE = re.compile(r'transfer|move', re.IGNORECASE)
+
 class DataProcessor:
     """Data processing utilities for financial data"""
     
@@ -19,20 +39,24 @@ class DataProcessor:
             "transfers": []
         }
         
+        add_income = categorized["income"].append
+        add_expense = categorized["expenses"].append
+        add_investment = categorized["investments"].append
+        add_transfer = categorized["transfers"].append
+        
         for transaction in transactions:
             amount = float(transaction.get('amount', 0))
-            description = str(transaction.get('description', '')).lower()
-            category = str(transaction.get('category', '')).lower()
+            description = str(transaction.get('description', ''))
             
-            # Determine transaction type
-            if amount > 0 and any(keyword in description for keyword in ['salary', 'deposit', 'income', 'payment']):
-                categorized["income"].append(transaction)
-            elif amount < 0 and any(keyword in description for keyword in ['investment', 'stock', 'etf', 'mutual']):
-                categorized["investments"].append(transaction)
-            elif any(keyword in description for keyword in ['transfer', 'move']):
-                categorized["transfers"].append(transaction)
+            # Determine transaction type (one case-insensitive regex scan per rule)
+            if amount > 0 and _INCOME_RE.search(description):
+                add_income(transaction)
+            elif amount < 0 and _INVESTMENT_RE.search(description):
+                add_investment(transaction)
+            elif _TRANSFER_RE.search(description):
+                add_transfer(transaction)
             else:
-                categorized["expenses"].append(transaction)
+                add_expense(transaction)
         
         return categorized
     
@@ -43,49 +67,117 @@ class DataProcessor:
             return {"trends": {}, "summary": {"total_spending": 0.0, "average_monthly_spending": 0.0, "top_categories": {}}}
         
         try:
-            df = pd.DataFrame(transactions)
-            df['date'] = pd.to_datetime(df['date'])
-            df['amount'] = pd.to_numeric(df['amount'])
-            
-            # Filter expenses (negative amounts)
-            expenses_df = df[df['amount'] < 0].copy()
-            expenses_df['amount'] = expenses_df['amount'].abs()
-            
-            if period == "monthly":
-                grouped = expenses_df.groupby([expenses_df['date'].dt.to_period('M'), 'category'])['amount'].sum().unstack(fill_value=0)
-                # === FIX: Str Period keys + flatten to dict of dicts ===
-                trends = {}
-                for period_obj in grouped.index:
-                    str_period = str(period_obj)  # '2025-11'
-                    period_row = grouped.loc[period_obj]
-                    trends[str_period] = period_row.to_dict()  # Series → dict
-                    # Ensure inner keys/values are str/float
-                    trends[str_period] = {str(cat): float(val) for cat, val in trends[str_period].items()}
-            else:
-                grouped = expenses_df.groupby('category')['amount'].sum()
-                trends = grouped.to_dict()
-                trends = {str(cat): float(val) for cat, val in trends.items()}
-            
-            # Summary (floats only)
-            total_spending = float(expenses_df['amount'].sum())
-            monthly_groups = expenses_df.groupby(expenses_df['date'].dt.to_period('M'))['amount'].sum()
-            avg_monthly_spending = float(monthly_groups.mean()) if len(monthly_groups) > 0 else 0.0
-            
-            top_raw = expenses_df.groupby('category')['amount'].sum().nlargest(5)
-            top_categories = {str(cat): float(val) for cat, val in top_raw.items()}
-            
-            return {
-                "trends": trends,
-                "summary": {
-                    "total_spending": total_spending,
-                    "average_monthly_spending": avg_monthly_spending,
-                    "top_categories": top_categories
-                }
-            }
+            groups = None
+            if pl is not None:
+                try:
+                    groups = DataProcessor._expense_groups_polars(transactions)
+                except Exception as e:
+                    logger.debug(f"Polars spending trends failed, using pandas: {str(e)}")
+            if groups is None:
+                groups = DataProcessor._expense_groups_pandas(transactions)
+            return DataProcessor._summarize_spending(groups, period)
         except Exception as e:
             logger.error(f"Error in analyze_spending_trends: {str(e)}")
             return {"trends": {}, "summary": {"total_spending": 0.0, "average_monthly_spending": 0.0, "top_categories": {}}}
     
+    @staticmethod
+    def _expense_groups_polars(transactions: List[Dict]) -> List[Tuple[Optional[str], Optional[str], float]]:
+        """Absolute expense totals per (month, category) from one lazy Polars scan"""
+        frame = pl.from_dicts(transactions, infer_schema_length=None)
+        dates = frame.get_column('date').cast(pl.Utf8)
+        # Same rule as _parse_dates: only all-ISO input is handled here; anything else
+        # raises and takes the pandas path, which resolves ambiguous day/month orders
+        if not dates.drop_nulls().str.contains(_ISO_DATE_PATTERN).all():
+            raise ValueError("Non-ISO dates")
+        
+        grouped = (
+            frame.lazy()
+            .select(
+                pl.col('date').cast(pl.Utf8).str.slice(0, 10).str.to_date('%Y-%m-%d').dt.strftime('%Y-%m').alias('month'),
+                pl.col('category').cast(pl.Utf8),
+                pl.col('amount').cast(pl.Float64)
+            )
+            .filter(pl.col('amount') < 0)
+            .group_by('month', 'category')
+            .agg(pl.col('amount').abs().sum())
+            .collect()
+        )
+        return grouped.rows()
+    
+    @staticmethod
+    def _expense_groups_pandas(transactions: List[Dict]) -> List[Tuple[Optional[str], Optional[str], float]]:
+        """Absolute expense totals per (month, category), built chunk by chunk so a large
+        import never materializes more than _CHUNK_SIZE rows as a DataFrame at once"""
+        sums: Dict[Tuple[Optional[str], Optional[str]], float] = defaultdict(float)
+        for start in range(0, len(transactions), _CHUNK_SIZE):
+            chunk = pd.DataFrame(transactions[start:start + _CHUNK_SIZE], columns=['date', 'category', 'amount'])
+            amounts = pd.to_numeric(chunk['amount'])
+            is_expense = amounts < 0
+            if not is_expense.any():
+                continue
+            
+            # Integer-backed month starts group on pandas' fast datetime64 path; only the
+            # distinct keys are formatted as strings afterwards
+            dates = DataProcessor._parse_dates(chunk.loc[is_expense, 'date'])
+            if dates.dt.tz is not None:
+                dates = dates.dt.tz_localize(None)
+            months = dates.to_numpy(dtype='datetime64[ns]').astype('datetime64[M]')
+            categories = chunk.loc[is_expense, 'category']
+            grouped = amounts[is_expense].abs().groupby([months, categories], sort=False, dropna=False).sum()
+            for (month, category), amount in grouped.items():
+                key = (None if pd.isna(month) else month.strftime('%Y-%m'),
+                       None if pd.isna(category) else str(category))
+                sums[key] += float(amount)
+        
+        return [(month, category, amount) for (month, category), amount in sums.items()]
+    
+    @staticmethod
+    def _parse_dates(dates: pd.Series) -> pd.Series:
+        """Parse dates the way the Polars path does: when every value is ISO (date, or date
+        plus time/offset), use its calendar-date part with an explicit format; otherwise
+        let pandas infer the format"""
+        text = dates.astype('string')
+        if text.str.fullmatch(_ISO_DATE_PATTERN).fillna(True).all():
+            return pd.to_datetime(text.str.slice(0, 10), format='%Y-%m-%d', cache=True)
+        return pd.to_datetime(dates, cache=True)
+    
+    @staticmethod
+    def _summarize_spending(groups: List[Tuple[Optional[str], Optional[str], float]], period: str) -> Dict[str, Any]:
+        """Build trends and summary from (month, category, amount) expense groups"""
+        total_spending = 0.0
+        month_totals: Dict[str, float] = {}
+        category_totals: Dict[str, float] = {}
+        by_month: Dict[str, Dict[str, float]] = {}
+        for month, category, amount in groups:
+            total_spending += amount
+            # Undated rows count toward totals but not toward any month; uncategorized
+            # rows likewise skip the per-category figures
+            if month is not None:
+                month_totals[month] = month_totals.get(month, 0.0) + amount
+            if category is not None:
+                category_totals[category] = category_totals.get(category, 0.0) + amount
+                if month is not None:
+                    by_month.setdefault(month, {})[category] = amount
+        
+        if period == "monthly":
+            month_categories = sorted({cat for row in by_month.values() for cat in row})
+            trends = {
+                month: {cat: float(by_month[month].get(cat, 0.0)) for cat in month_categories}
+                for month in sorted(by_month)
+            }
+        else:
+            trends = {cat: float(category_totals[cat]) for cat in sorted(category_totals)}
+        
+        top = sorted(sorted(category_totals), key=lambda cat: -category_totals[cat])[:5]
+        return {
+            "trends": trends,
+            "summary": {
+                "total_spending": float(total_spending),
+                "average_monthly_spending": float(sum(month_totals.values()) / len(month_totals)) if month_totals else 0.0,
+                "top_categories": {cat: float(category_totals[cat]) for cat in top}
+            }
+        }
+    
     @staticmethod
     def calculate_financial_ratios(income: float, expenses: float, debts: List[Dict], assets: float) -> Dict[str, float]:
         """Calculate key financial ratios"""
@@ -108,26 +200,30 @@ class DataProcessor:
             return []
         
         try:
-            df = pd.DataFrame(transactions)
-            amounts = df['amount'].abs()
+            # Columnar pass: one array of amounts, a threshold mask computed in numpy, and
+            # z-scores and dicts built only for the flagged rows
+            signed = np.fromiter((float(t['amount']) for t in transactions), dtype=np.float64, count=len(transactions))
+            amounts = np.abs(signed)
             
-            mean = float(amounts.mean())
-            std = float(amounts.std())
+            mean = amounts.mean()
+            std = amounts.std(ddof=1)
+            if not std > 0:
+                return []
             
+            # (amount - mean) > threshold * std is z > threshold without a full-array divide
             anomalies = []
-            for transaction in transactions:
-                amt = abs(float(transaction['amount']))
-                z_score = (amt - mean) / std if std > 0 else 0.0
-                if z_score > threshold:
-                    # Flat dict, str/float only
-                    anomalies.append({
-                        "description": str(transaction.get('description', '')),
-                        "amount": float(amt),
-                        "category": str(transaction.get('category', '')),
-                        "date": str(transaction.get('date', '')),
-                        "z_score": round(z_score, 2),
-                        "anomaly_type": "high_value" if float(transaction.get('amount', 0)) > 0 else "high_spending"
-                    })
+            for i in np.flatnonzero(amounts - mean > threshold * std):
+                transaction = transactions[i]
+                z_score = (amounts[i] - mean) / std
+                # Flat dict, str/float only
+                anomalies.append({
+                    "description": str(transaction.get('description', '')),
+                    "amount": float(amounts[i]),
+                    "category": str(transaction.get('category', '')),
+                    "date": str(transaction.get('date', '')),
+                    "z_score": round(float(z_score), 2),
+                    "anomaly_type": "high_value" if signed[i] > 0 else "high_spending"
+                })
             
             return anomalies
         except Exception as e:
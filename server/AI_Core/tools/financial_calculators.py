@@ -1,30 +1,47 @@
+import functools
 import math
 from typing import Dict, List, Tuple, Optional
-from datetime import datetime, timedelta
+from datetime import datetime
+from dateutil.relativedelta import relativedelta
 from enum import Enum
 
+# Compounding periods per year for calculate_compound_interest
+_COMPOUNDING_PERIODS = {
+    "annual": 1,
+    "monthly": 12,
+    "quarterly": 4,
+    "daily": 365
+}
+
 class RiskProfile(str, Enum):
     CONSERVATIVE = "conservative"
     MODERATE = "moderate"
     AGGRESSIVE = "aggressive"
 
+def _memoize(func):
+    """lru_cache for the pure calculators; dict results are copied so callers can't alter the cached one"""
+    cached = functools.lru_cache(maxsize=1024)(func)
+    
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        result = cached(*args, **kwargs)
+        return dict(result) if isinstance(result, dict) else result
+    
+    wrapper.cache_info = cached.cache_info
+    wrapper.cache_clear = cached.cache_clear
+    return wrapper
+
 class FinancialCalculators:
     """Financial calculation utilities"""
     
     @staticmethod
+    @_memoize
     def calculate_compound_interest(principal: float, rate: float, years: int, 
                                   compounding: str = "annual") -> Dict[str, float]:
         """Calculate compound interest with different compounding periods"""
-        compounding_factors = {
-            "annual": 1,
-            "monthly": 12,
-            "quarterly": 4,
-            "daily": 365
-        }
-        
-        n = compounding_factors.get(compounding, 1)
-        rate_decimal = rate / 100
-        amount = principal * (1 + rate_decimal/n) ** (n * years)
+        n = _COMPOUNDING_PERIODS.get(compounding, 1)
+        rate_per_period = rate / 100 / n
+        amount = principal * (1 + rate_per_period) ** (n * years)
         interest_earned = amount - principal
         
         return {
@@ -34,6 +51,7 @@ class FinancialCalculators:
         }
     
     @staticmethod
+    @_memoize
     def calculate_loan_payment(principal: float, annual_rate: float, years: int) -> Dict[str, float]:
         """Calculate monthly loan payment using amortization formula"""
         monthly_rate = annual_rate / 100 / 12
@@ -66,33 +84,44 @@ class FinancialCalculators:
         extra_payment = 100  # Assume $100 extra payment
         current_month = 0
         
-        for debt in sorted_debts:
+        for position, debt in enumerate(sorted_debts, start=1):
             balance = debt['balance']
             min_payment = debt.get('minimum_payment', balance * 0.03)
             interest_rate = debt.get('interest_rate', 0) / 100 / 12
             
-            months = 0
-            while balance > 0 and months < 600:  # 50-year safety limit
-                interest = balance * interest_rate
-                payment = min_payment + extra_payment
-                
-                if payment > balance + interest:
-                    payment = balance + interest
-                
-                balance = balance + interest - payment
-                months += 1
+            months = FinancialCalculators._months_to_payoff(balance, min_payment + extra_payment, interest_rate)
             
             debt['payoff_months'] = months
             debt['payoff_date'] = FinancialCalculators._calculate_future_date(months)
             current_month += months
             
             # Add extra payment to next debt
-            if len(sorted_debts) > sorted_debts.index(debt) + 1:
+            if position < len(sorted_debts):
                 extra_payment += min_payment
         
         return sorted_debts
     
     @staticmethod
+    def _months_to_payoff(balance: float, payment: float, monthly_rate: float, max_months: int = 600) -> int:
+        """Months of fixed payments needed to clear a balance (closed-form amortization)"""
+        if balance <= 0:
+            return 0
+        if monthly_rate == 0:
+            if payment <= 0:
+                return max_months
+            months = balance / payment
+        else:
+            # Payment must outgrow the monthly interest, otherwise the debt never clears
+            interest = balance * monthly_rate
+            if payment <= interest:
+                return max_months
+            months = math.log(payment / (payment - interest)) / math.log1p(monthly_rate)
+        
+        # Tolerance keeps exact payoffs (e.g. 1000 at 100/month) from rounding up a month
+        return min(max(math.ceil(months - 1e-9), 1), max_months)
+    
+    @staticmethod
+    @_memoize
     def calculate_retirement_savings(current_age: int, retirement_age: int, current_savings: float,
                                    monthly_contribution: float, expected_return: float) -> Dict[str, float]:
         """Calculate retirement savings projection"""
@@ -100,19 +129,25 @@ class FinancialCalculators:
         months_to_retirement = years_to_retirement * 12
         
         monthly_rate = expected_return / 100 / 12
-        future_value = current_savings * (1 + monthly_rate) ** months_to_retirement
+        growth = (1 + monthly_rate) ** months_to_retirement
+        future_value = current_savings * growth
         
-        # Future value of contributions
+        # Future value of contributions (plain sum when there is no return)
         if monthly_contribution > 0:
-            future_value += monthly_contribution * ((1 + monthly_rate) ** months_to_retirement - 1) / monthly_rate
+            if monthly_rate:
+                future_value += monthly_contribution * (growth - 1) / monthly_rate
+            else:
+                future_value += monthly_contribution * months_to_retirement
         
+        total_contributions = current_savings + (monthly_contribution * months_to_retirement)
         return {
             "projected_savings": round(future_value, 2),
-            "total_contributions": current_savings + (monthly_contribution * months_to_retirement),
-            "growth_earned": round(future_value - (current_savings + monthly_contribution * months_to_retirement), 2)
+            "total_contributions": total_contributions,
+            "growth_earned": round(future_value - total_contributions, 2)
         }
     
     @staticmethod
+    @_memoize
     def assess_risk_profile(age: int, investment_experience: str, time_horizon: int, 
                           risk_tolerance: str) -> RiskProfile:
         """Assess investor risk profile"""
@@ -151,6 +186,6 @@ class FinancialCalculators:
     
     @staticmethod
     def _calculate_future_date(months_from_now: int) -> str:
-        """Calculate future date given months from now"""
-        future_date = datetime.now() + timedelta(days=months_from_now * 30)
+        """Calculate future date given months from now (calendar months, clamped to month end)"""
+        future_date = datetime.now() + relativedelta(months=months_from_now)
         return future_date.strftime("%Y-%m-%d")
\ No newline at end of file
@@ -4,24 +4,28 @@ Utility functions and helpers
 
 from .helpers import (
     setup_logging,
+    setup_llm_cache,
     validate_email,
     format_currency,
     parse_financial_input,
     calculate_age,
     generate_report_id,
     safe_json_loads,
+    safe_json_dumps,
     calculate_months_between,
     ColorFormatter
 )
 
 __all__ = [
     "setup_logging",
+    "setup_llm_cache",
     "validate_email",
     "format_currency", 
     "parse_financial_input",
     "calculate_age",
     "generate_report_id",
     "safe_json_loads",
+    "safe_json_dumps",
     "calculate_months_between",
     "ColorFormatter"
 ]
\ No newline at end of file
@@ -1,11 +1,31 @@
 import logging
 import json
+import os
 import sys
 import codecs
+import functools
 from typing import Any, Dict, List, Optional
 from datetime import datetime, timedelta
 import re
 
+try:
+    import orjson
+except ImportError:  # Optional: the stdlib json module is used instead
+    orjson = None
+
+_EMAIL_RE = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+
+# Amount followed by a keyword, per field extracted by parse_financial_input
+_FINANCIAL_PATTERNS = {
+    key: re.compile(pattern, re.IGNORECASE)
+    for key, pattern in {
+        'income': r'\$?(\d+(?:,\d+)*(?:\.\d+)?)\s*(?:salary|income|earn)',
+        'expenses': r'\$?(\d+(?:,\d+)*(?:\.\d+)?)\s*(?:spend|expense|cost)',
+        'savings': r'\$?(\d+(?:,\d+)*(?:\.\d+)?)\s*(?:save|savings|emergency fund)',
+        'debt': r'\$?(\d+(?:,\d+)*(?:\.\d+)?)\s*(?:debt|loan|owe|credit card)'
+    }.items()
+}
+
 def setup_logging(level: str = "INFO") -> logging.Logger:
     """Setup application logging with UTF-8 encoding for Windows"""
     
@@ -31,31 +51,46 @@ def setup_logging(level: str = "INFO") -> logging.Logger:
     
     return logging.getLogger(__name__)
 
+def setup_llm_cache(database_path: Optional[str] = None, max_entries: int = 256) -> None:
+    """Install a process-wide LangChain LLM cache so repeated prompts skip the API call.
+
+    Bounded and in-memory unless a database path opts into the persistent SQLite cache.
+    """
+    from langchain_core.globals import set_llm_cache
+    
+    if database_path:
+        try:
+            from langchain_community.cache import SQLiteCache
+            os.makedirs(os.path.dirname(os.path.abspath(database_path)), exist_ok=True)
+            set_llm_cache(SQLiteCache(database_path=database_path))
+            return
+        except ImportError:
+            logging.getLogger(__name__).warning(
+                "langchain-community is not installed; using the in-memory LLM cache instead of %s",
+                database_path
+            )
+    
+    from langchain_core.caches import InMemoryCache
+    set_llm_cache(InMemoryCache(maxsize=max_entries))
+
 def validate_email(email: str) -> bool:
     """Validate email format"""
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(pattern, email) is not None
+    return _EMAIL_RE.fullmatch(email) is not None
 
+@functools.lru_cache(maxsize=4096)
 def format_currency(amount: float) -> str:
     """Format currency with proper formatting (Indian Rupees)"""
     return f"₹{amount:,.2f}"
 
 def parse_financial_input(text: str) -> Dict[str, Any]:
     """Parse financial information from user input"""
-    patterns = {
-        'income': r'\$?(\d+(?:,\d+)*(?:\.\d+)?)\s*(?:salary|income|earn)',
-        'expenses': r'\$?(\d+(?:,\d+)*(?:\.\d+)?)\s*(?:spend|expense|cost)',
-        'savings': r'\$?(\d+(?:,\d+)*(?:\.\d+)?)\s*(?:save|savings|emergency fund)',
-        'debt': r'\$?(\d+(?:,\d+)*(?:\.\d+)?)\s*(?:debt|loan|owe|credit card)'
-    }
-    
     extracted = {}
-    for key, pattern in patterns.items():
-        matches = re.findall(pattern, text, re.IGNORECASE)
-        if matches:
+    for key, pattern in _FINANCIAL_PATTERNS.items():
+        match = pattern.search(text)
+        if match:
             # Take the first match and convert to float
             try:
-                value = float(matches[0].replace(',', ''))
+                value = float(match.group(1).replace(',', ''))
                 extracted[key] = value
             except ValueError:
                 continue
@@ -84,11 +119,25 @@ def generate_report_id() -> str:
 
 def safe_json_loads(json_string: str) -> Dict[str, Any]:
     """Safely parse JSON string with error handling"""
+    if orjson is not None:
+        try:
+            return orjson.loads(json_string)
+        except orjson.JSONDecodeError:
+            pass  # stdlib also accepts NaN/Infinity literals, so let it decide
     try:
         return json.loads(json_string)
     except json.JSONDecodeError:
         return {}
 
+def safe_json_dumps(obj: Any) -> str:
+    """Serialize to a UTF-8 JSON string, stringifying anything without a JSON form"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+        except TypeError:
+            pass  # e.g. integers wider than 64 bits
+    return json.dumps(obj, ensure_ascii=False, default=str)
+
 def calculate_months_between(start_date: str, end_date: str) -> int:
     """Calculate months between two dates"""
     try: